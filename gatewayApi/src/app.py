@@ -1,9 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from src.routes import login, device
+from src.auth.security import shutdown_password_pool
+from src.database.connection import close_connection, connect
+from src.routes import login, device, readings, live, latest, metrics
+from src.database.indexes import ensure_indexes
+from src.services.latest_service import latest_table
+from src.services.live_service import live_hub
+from src.util.logging import get_logger
 from fastapi.middleware.cors import CORSMiddleware
 
+logger = get_logger(__name__)
 
-app = FastAPI()
+
+async def _ensure_indexes() -> None:
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        # La API puede funcionar sin índices; se reintentará en el próximo arranque
+        logger.error(f"No se pudieron verificar los índices: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Tareas de arranque y parada de la API."""
+    connect()
+    # Los índices se verifican en segundo plano para no retrasar el arranque
+    indexes_task = asyncio.create_task(_ensure_indexes())
+    try:
+        await latest_table.load()
+    except Exception as e:
+        # Sin precarga la tabla se irá llenando con la ingesta
+        logger.error(f"No se pudieron precargar los últimos valores: {e}")
+    yield
+    # Cierra los flujos SSE abiertos para no bloquear el apagado
+    live_hub.close()
+    indexes_task.cancel()
+    await close_connection()
+    shutdown_password_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +57,10 @@ app.add_middleware(
 
 app.include_router(login.router)
 app.include_router(device.router)
+app.include_router(readings.router)
+app.include_router(live.router)
+app.include_router(latest.router)
+app.include_router(metrics.router)
 
 
 
@@ -2,13 +2,12 @@
 Dependencias de autenticación para FastAPI
 """
 from typing import Annotated, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from src.auth.security import verify_token, get_user_from_token
-from src.database.connection import get_database
-from src.models.model import User, TokenData, KeysNames, CollectionNames
+from src.models.model import User, TokenData
+from src.services.user_service import get_user
 from src.util.logging import get_logger
-from motor.motor_asyncio import AsyncIOMotorDatabase
 
 logger = get_logger(__name__)
 
@@ -22,10 +21,12 @@ oauth2_scheme = OAuth2PasswordBearer(
     }
 )
 
+# Mismo esquema sin error automático, para rutas que aceptan el token por otra vía
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
 async def get_current_user(
     security_scopes: SecurityScopes,
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    token: Annotated[str, Depends(oauth2_scheme)]
 ) -> User:
     """
     Obtiene el usuario actual basado en el token JWT
@@ -58,17 +59,12 @@ async def get_current_user(
         logger.error(f"Error al procesar token: {e}")
         raise credentials_exception
     
-    # Verificar que el usuario existe en la base de datos
+    # Verificar que el usuario existe (caché de usuarios o base de datos)
     try:
-        users_collection = db[CollectionNames.USERS.value]
-        user_dict = await users_collection.find_one({KeysNames.USERNAME: token_data.username})
+        user = await get_user(token_data.username)
         
-        if user_dict is None:
+        if user is None:
             raise credentials_exception
-            
-        # Convertir a modelo User
-        user_dict["id"] = str(user_dict["_id"])
-        user = User(**user_dict)
         
     except Exception as e:
         logger.error(f"Error al obtener usuario de la base de datos: {e}")
@@ -112,6 +108,16 @@ async def verify_token_only(
         logger.error(f"Error validando token: {e}")
         raise credentials_exception
 
+async def verify_stream_token(
+    token: Annotated[Optional[str], Depends(optional_oauth2_scheme)],
+    access_token: Annotated[Optional[str], Query(description="Token de acceso para clientes EventSource")] = None
+) -> None:
+    """
+    Igual que verify_token_only pero admite el token como parámetro de la URL,
+    ya que EventSource no permite enviar cabeceras
+    """
+    await verify_token_only(token or access_token or "")
+
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
 ) -> User:
@@ -1,14 +1,43 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from src.core.config import settings
+from src.util.cache import TTLCache
 from src.util.logging import get_logger
 
 logger = get_logger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Claims ya verificados por resumen SHA-256 del token; cada entrada caduca con el `exp` del token
+token_cache: TTLCache[Dict[str, Any]] = TTLCache(settings.JWT_CACHE_SIZE, settings.JWT_CACHE_TTL_SECONDS)
+# Tokens revocados por resumen; cada entrada dura hasta el `exp` del token y
+# nunca se expulsa antes. Solo se revocan tokens con firma válida y, si la lista
+# está llena, la revocación falla en lugar de olvidar otra
+_revoked: TTLCache[bool] = TTLCache(
+    settings.JWT_REVOKED_MAX,
+    max(settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES, settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES) * 60,
+    evict=False,
+)
+
+
+class RevocationListFull(Exception):
+    """La lista de tokens revocados está llena (JWT_REVOKED_MAX)."""
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _is_revoked(digest: bytes) -> bool:
+    return _revoked.get(digest) is not None
+
 def hash_password(password: str) -> str:
     """Cifra la contraseña usando bcrypt."""
     return pwd_context.hash(password)
@@ -17,6 +46,76 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña en texto plano coincide con la cifrada."""
     return pwd_context.verify(plain_password, hashed_password)
 
+
+class PasswordPoolBusy(Exception):
+    """No hay hueco en el pool de bcrypt antes de PASSWORD_QUEUE_TIMEOUT_SECONDS."""
+
+
+@dataclass
+class PasswordPoolStats:
+    active: int = 0
+    waiting: int = 0
+    completed: int = 0
+    rejected: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+# bcrypt libera el GIL, así que los hilos trabajan en paralelo sin bloquear el bucle de eventos
+_password_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+password_stats = PasswordPoolStats()
+
+
+async def _run_password_task(func, *args):
+    """
+    Ejecuta `func` en el pool de bcrypt. Como mucho PASSWORD_HASH_WORKERS a la
+    vez; si no hay hueco en PASSWORD_QUEUE_TIMEOUT_SECONDS lanza PasswordPoolBusy.
+    """
+    password_stats.waiting += 1
+    try:
+        await asyncio.wait_for(_password_slots.acquire(), timeout=settings.PASSWORD_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        password_stats.rejected += 1
+        raise PasswordPoolBusy("Pool de contraseñas saturado")
+    finally:
+        password_stats.waiting -= 1
+
+    password_stats.active += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_pool, func, *args)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        password_stats.active -= 1
+        password_stats.completed += 1
+        password_stats.total_ms += elapsed
+        password_stats.max_ms = max(password_stats.max_ms, elapsed)
+        _password_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password fuera del bucle de eventos."""
+    return await _run_password_task(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fuera del bucle de eventos."""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+def get_password_pool_stats() -> Dict[str, Any]:
+    stats = password_stats
+    return {
+        **stats.__dict__,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "avg_ms": round(stats.total_ms / stats.completed, 3) if stats.completed else None,
+    }
+
+
+def shutdown_password_pool() -> None:
+    _password_pool.shutdown(wait=False, cancel_futures=True)
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Crea un token de acceso JWT
@@ -64,7 +163,19 @@ def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, A
     Verifica y decodifica un token JWT
     """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        digest = _digest(token)
+        if _is_revoked(digest):
+            logger.warning("Token revocado")
+            return None
+
+        payload = token_cache.get(digest)
+        if payload is None:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            exp = payload.get("exp")
+            if exp is not None:
+                # La caché usa un reloj monotónico: se traduce el tiempo que le queda al token
+                token_cache.set(digest, payload, expires=token_cache.clock() + (exp - time.time()))
+        payload = dict(payload)
         
         # Verificar el tipo de token
         if payload.get("type") != token_type:
@@ -93,6 +204,29 @@ def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, A
         logger.error(f"Error inesperado al verificar token: {e}")
         return None
 
+def revoke_token(token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
+    """
+    Revoca un token hasta su expiración: se retira de la caché de claims y se
+    rechaza en verify_token aunque su firma siga siendo válida. Solo se
+    revocan tokens válidos del tipo indicado; devuelve sus claims o None.
+
+    :raises RevocationListFull: Si no cabe la revocación.
+    """
+    payload = verify_token(token, token_type)
+    if payload is None:
+        return None
+    digest = _digest(token)
+    if not _revoked.set(digest, True, expires=_revoked.clock() + (payload["exp"] - time.time())):
+        logger.error(f"Lista de tokens revocados llena ({settings.JWT_REVOKED_MAX})")
+        raise RevocationListFull("Lista de tokens revocados llena")
+    token_cache.invalidate(digest)
+    return payload
+
+
+def get_token_cache_stats() -> Dict[str, Any]:
+    return {**token_cache.as_dict(), "revoked": _revoked.as_dict()}
+
+
 def get_user_from_token(token: str) -> Optional[str]:
     """
     Extrae el username del token JWT
@@ -20,12 +20,28 @@ class Settings(BaseSettings):
     MONGO_PASSWORD: str = "admin123"
     MONGO_HOST: str = "database_ems"
     MONGO_PORT: int = 27017
+
+    # Pool de conexiones (un cliente por proceso)
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 5
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
     
     # JWT Configuration
     JWT_SECRET_KEY: str = "your_secret_key"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     JWT_REFRESH_TOKEN_EXPIRE_MINUTES: int = 1440  
+    # Caché de tokens ya verificados (la caducidad real es el `exp` de cada token)
+    JWT_CACHE_SIZE: int = 4096
+    JWT_CACHE_TTL_SECONDS: float = 3600.0
+    # Tokens revocados vigentes a la vez; con la lista llena el logout responde 503
+    JWT_REVOKED_MAX: int = 100000
+
+    # Pool de bcrypt: hilos (= operaciones simultáneas) y espera máxima antes de responder 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_QUEUE_TIMEOUT_SECONDS: float = 2.0
     
     # Admin User (for initialization)
     ADMIN_USERNAME: str = "admin"
@@ -33,7 +49,35 @@ class Settings(BaseSettings):
     IS_ADMIN: bool = False
     EMAIL_ADMIN: str = "admin@example.com"
 
+    # Caché de usuarios autenticados
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 30.0
+
     api_port : int = 8008
+
+    # Lecturas (colección readings en buckets)
+    READINGS_BUCKET_SECONDS: int = 60
+    READINGS_BATCH_SIZE: int = 500
+    READINGS_DEFAULT_GROUP: str = "main"
+    ROLLUP_MAX_POINTS: int = 1000
+
+    # Consultas de lecturas
+    QUERY_BATCH_SIZE: int = 1000
+    QUERY_MAX_CHANNELS: int = 50
+    QUERY_CHUNK_BYTES: int = 65536
+
+    # Lecturas en vivo (SSE)
+    LIVE_QUEUE_SIZE: int = 100
+    LIVE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Últimos valores en memoria: un canal sin datos en este tiempo se marca como obsoleto
+    LATEST_STALE_SECONDS: float = 60.0
+
+    # Energía integrada desde potencia instantánea
+    ENERGY_POWER_CHANNELS: list[str] = ["POWER_ACTIVE_INST_TOTAL", "POWER_ACTIVE_INST_A", "POWER_ACTIVE_INST_B"]
+    ENERGY_POWER_TO_KW: float = 0.001  # los canales de potencia están en W
+    ENERGY_MAX_GAP_SECONDS: float = 300.0
+    ENERGY_GAP_POLICY: str = "skip"  # skip | hold | linear
     
     
     @property
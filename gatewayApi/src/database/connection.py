@@ -1,37 +1,141 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
 from src.core.config import settings
 from src.util.logging import get_logger
-from typing import AsyncGenerator, Annotated
 
 
+logger = get_logger(__name__)
 
 
-logger = get_logger(__name__)
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Métricas del pool de conexiones a partir de los eventos de pymongo.
+    Los eventos llegan desde los hilos del driver, por eso el lock.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.pools_cleared = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            # `duration` (s) incluye la espera en la cola y el establecimiento de la conexión
+            self._latencies.append(getattr(event, "duration", 0.0) * 1000)
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            checkout_ms = {}
+            if latencies:
+                checkout_ms = {
+                    "p50": round(latencies[len(latencies) // 2], 3),
+                    "p95": round(latencies[int(len(latencies) * 0.95)], 3),
+                    "max": round(latencies[-1], 3),
+                }
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pools_cleared": self.pools_cleared,
+                "checkout_ms": checkout_ms,
+                "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+            }
+
+
+pool_metrics = PoolMetrics()
 
 _client: AsyncIOMotorClient | None = None
 
-async def get_database() -> AsyncIOMotorDatabase:
-    """Devuelve una instancia única de la base de datos MongoDB."""
+
+def connect() -> AsyncIOMotorClient:
+    """
+    Crea el cliente compartido (un pool de conexiones por proceso). La API lo
+    crea en su lifespan; los scripts lo crean al primer uso.
+    """
     global _client
     if _client is None:
         try:
-            _client = AsyncIOMotorClient(settings.mongodb_uri)        
+            _client = AsyncIOMotorClient(
+                settings.mongodb_uri,
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=[pool_metrics],
+            )
+            logger.info(f"Cliente MongoDB creado (pool {settings.MONGO_MIN_POOL_SIZE}-{settings.MONGO_MAX_POOL_SIZE})")
         except Exception as e:
             logger.error(f"Error al conectar a MongoDB: {e}")
             raise
-        
-    return _client[settings.MONGO_DATABASE]
+    return _client
+
+
+async def get_database() -> AsyncIOMotorDatabase:
+    """Devuelve la base de datos del cliente compartido."""
+    return connect()[settings.MONGO_DATABASE]
 
 
 async def close_connection() -> None:
-    """Cierra la conexión a la base de datos MongoDB."""
+    """Cierra el cliente compartido. Solo al apagar la API o al terminar un script."""
     global _client
     if _client:
         _client.close()
         _client = None
+        logger.info("Cliente MongoDB cerrado")
     else:
         logger.warning("No hay conexión activa para cerrar.")
-        
-
 
 
+def get_pool_stats() -> Dict[str, Any]:
+    return pool_metrics.as_dict()
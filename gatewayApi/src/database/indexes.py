@@ -0,0 +1,121 @@
+"""
+Índices declarados por colección.
+
+Al arrancar la API se comparan con los existentes: se crean los que faltan
+(create_index es idempotente) y se informa de la deriva, es decir, índices
+declarados con otra definición en la base de datos o índices que existen
+sin estar declarados. La deriva solo se informa; nunca se borra nada.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+from src.database.connection import get_database
+from src.models.model import CollectionNames
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+Keys = List[Tuple[str, int]]
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+
+    @classmethod
+    def of(cls, name: str, keys: Keys, unique: bool = False) -> "IndexSpec":
+        return cls(name, tuple(keys), unique)
+
+
+_DEVICE_BUCKET = IndexSpec.of("device_bucket", [("device", ASCENDING), ("bucket", ASCENDING)], unique=True)
+
+INDEXES: Dict[CollectionNames, List[IndexSpec]] = {
+    CollectionNames.USERS: [
+        IndexSpec.of("username_unique", [("username", ASCENDING)], unique=True),
+    ],
+    CollectionNames.LOGS: [
+        IndexSpec.of("device_timestamp", [("device", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    CollectionNames.READINGS: [
+        IndexSpec.of("device_group_bucket", [("device", ASCENDING), ("group", ASCENDING), ("bucket", ASCENDING)], unique=True),
+        IndexSpec.of("device_bucket", [("device", ASCENDING), ("bucket", ASCENDING)]),
+    ],
+    CollectionNames.ROLLUP_1M: [_DEVICE_BUCKET],
+    CollectionNames.ROLLUP_15M: [_DEVICE_BUCKET],
+    CollectionNames.ROLLUP_1H: [_DEVICE_BUCKET],
+    CollectionNames.ROLLUP_1D: [_DEVICE_BUCKET],
+}
+
+
+@dataclass
+class IndexReport:
+    """Resultado de la última verificación de índices."""
+    checked_at: Optional[str] = None
+    created: List[str] = field(default_factory=list)
+    drift: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+index_report = IndexReport()
+
+
+def _describe(info: Dict[str, Any]) -> Tuple[Tuple[Tuple[str, Any], ...], bool]:
+    # Las direcciones se comparan tal cual: pueden ser 1/-1 (o 1.0) pero también
+    # "text", "hashed" o "2dsphere"
+    keys = tuple((name, direction) for name, direction in info["key"])
+    return keys, bool(info.get("unique", False))
+
+
+async def ensure_indexes() -> IndexReport:
+    """Crea los índices declarados que falten e informa de la deriva."""
+    global index_report
+    report = IndexReport()
+    database = await get_database()
+    for collection_name, specs in INDEXES.items():
+        collection = database[collection_name.value]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError as e:
+            report.errors.append(f"{collection_name}: {e}")
+            continue
+        declared = {spec.name for spec in specs}
+
+        for spec in specs:
+            info = existing.get(spec.name)
+            if info is None:
+                same_keys = [name for name, other in existing.items() if _describe(other)[0] == spec.keys]
+                if same_keys:
+                    report.drift.append(f"{collection_name}.{spec.name}: existe con otro nombre ({same_keys[0]})")
+                    continue
+                try:
+                    await collection.create_index(list(spec.keys), name=spec.name, unique=spec.unique)
+                    report.created.append(f"{collection_name}.{spec.name}")
+                except PyMongoError as e:
+                    # p.ej. duplicados que impiden un índice único
+                    report.errors.append(f"{collection_name}.{spec.name}: {e}")
+            elif _describe(info) != (spec.keys, spec.unique):
+                report.drift.append(f"{collection_name}.{spec.name}: definición distinta {info['key']} unique={info.get('unique', False)}")
+
+        for name in existing.keys() - declared - {"_id_"}:
+            report.drift.append(f"{collection_name}.{name}: no declarado")
+
+    report.checked_at = datetime.now(timezone.utc).isoformat()
+    if report.created:
+        logger.info(f"Índices creados: {report.created}")
+    for item in report.drift:
+        logger.warning(f"Deriva de índices: {item}")
+    for item in report.errors:
+        logger.error(f"Error de índices: {item}")
+    index_report = report
+    return report
+
+
+def get_index_report() -> Dict[str, Any]:
+    return index_report.as_dict()
@@ -57,11 +57,30 @@ class CollectionNames(str, Enum):
     """Nombres de las colecciones en MongoDB"""
     USERS = "users"
     LOGS = "logs"
+    READINGS = "readings"
+    ROLLUP_1M = "readings_1m"
+    ROLLUP_15M = "readings_15m"
+    ROLLUP_1H = "readings_1h"
+    ROLLUP_1D = "readings_1d"
     
     def __str__(self) -> str:
         return str(self.value)
 
 
+class Aggregation(str, Enum):
+    """Agregados disponibles en las consultas de lecturas"""
+    AVG = "avg"
+    MIN = "min"
+    MAX = "max"
+    SUM = "sum"
+    COUNT = "count"
+    LAST = "last"
+    ENERGY = "energy"
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
 class KeysNames(str, Enum):
     """Nombres de las claves en los documentos"""
     USERNAME = "username"
@@ -98,4 +117,12 @@ class Device(BaseModel):
 class DeviceResponse(BaseModel):
     """Respuesta para operaciones con dispositivos"""
     name: str = Field(..., description="Nombre del dispositivo")
-    success: bool = Field(default=True, description="Indica si la operación fue exitosa")
\ No newline at end of file
+    success: bool = Field(default=True, description="Indica si la operación fue exitosa")
+
+
+class ReadingsIngestResponse(BaseModel):
+    """Resultado de la ingesta de un lote de lecturas"""
+    rows: int = Field(..., description="Filas (dispositivo + instante) recibidas")
+    stored: int = Field(..., description="Filas guardadas en la base de datos")
+    samples: int = Field(..., description="Muestras (valores de canal) recibidas")
+    buckets: int = Field(..., description="Buckets creados o actualizados")
@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+from src.core.config import settings
+from src.database.connection import get_database
+from src.models.model import Aggregation, CollectionNames
+from src.repositories.readings_repository import bucket_start
+from src.repositories.rollup_repository import RAW_RESOLUTION, RESOLUTIONS, dedupe_samples, truncate_date
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _missing(field: str) -> Dict[str, Any]:
+    return {"$eq": [{"$type": field}, "missing"]}
+
+
+def _needed(aggs: List[Aggregation]) -> set:
+    """Acumuladores del $group que hacen falta para los agregados pedidos."""
+    needed = {agg.value for agg in aggs}
+    if Aggregation.AVG in aggs:
+        needed |= {Aggregation.SUM.value, Aggregation.COUNT.value}
+    return needed
+
+
+def _output(channels: List[str], aggs: List[Aggregation]) -> Dict[str, Any]:
+    """Proyección final: {t, canal: {agregado: valor}} solo con lo pedido."""
+    projection: Dict[str, Any] = {"_id": 0, "t": "$_id"}
+    for index, name in enumerate(channels):
+        fields: Dict[str, Any] = {}
+        for agg in aggs:
+            if agg is Aggregation.AVG:
+                fields["avg"] = {"$cond": [{"$gt": [f"$c{index}_count", 0]}, {"$divide": [f"$c{index}_sum", f"$c{index}_count"]}, None]}
+            elif agg is Aggregation.LAST:
+                fields["last"] = f"$c{index}_last.v"
+            else:
+                fields[agg.value] = f"$c{index}_{agg.value}"
+        projection[name] = fields
+    return projection
+
+
+def _rollup_pipeline(device: str, channels: List[str], start: datetime, end: datetime,
+                     seconds: int, source_seconds: int, aggs: List[Aggregation]) -> List[Dict[str, Any]]:
+    """
+    Re-agrega rollups de `source_seconds` a buckets de `seconds`. Se proyectan
+    solo los canales pedidos antes del $group para no mover el resto.
+    """
+    needed = _needed(aggs)
+    group: Dict[str, Any] = {"_id": truncate_date("$bucket", seconds)}
+    for index, name in enumerate(channels):
+        base = f"$channels.{name}"
+        accumulators = {
+            "min": {"$min": f"{base}.min"},
+            "max": {"$max": f"{base}.max"},
+            "sum": {"$sum": f"{base}.sum"},
+            "count": {"$sum": f"{base}.count"},
+            "energy": {"$sum": f"{base}.energy_kwh"},
+            "last": {"$max": {"$cond": [_missing(f"{base}.last_t"), None, {"t": f"{base}.last_t", "v": f"{base}.last"}]}},
+        }
+        group.update({f"c{index}_{key}": acc for key, acc in accumulators.items() if key in needed})
+    return [
+        {"$match": {"device": device, "bucket": {"$gte": bucket_start(start.timestamp(), source_seconds), "$lt": end}}},
+        {"$project": {"bucket": 1, **{f"channels.{name}": 1 for name in channels}}},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+        {"$project": _output(channels, aggs)},
+    ]
+
+
+def _raw_match(device: str, channels: List[str], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Muestras crudas del rango con alguno de los canales, sin duplicados (como en los rollups)."""
+    return [
+        {"$match": {
+            "device": device,
+            "bucket": {"$gte": bucket_start(start.timestamp(), settings.READINGS_BUCKET_SECONDS), "$lt": end},
+        }},
+        {"$unwind": "$samples"},
+        {"$match": {"samples.t": {"$gte": start, "$lt": end}, "$or": [{f"samples.v.{name}": {"$exists": True}} for name in channels]}},
+        *dedupe_samples(),
+    ]
+
+
+def _raw_points_pipeline(device: str, channels: List[str], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Muestras crudas de los canales pedidos, ordenadas por instante."""
+    return _raw_match(device, channels, start, end) + [
+        {"$project": {"_id": 0, "t": "$samples.t", **{name: f"$samples.v.{name}" for name in channels}}},
+        {"$sort": {"t": 1}},
+    ]
+
+
+def _raw_grouped_pipeline(device: str, channels: List[str], start: datetime, end: datetime,
+                          seconds: int, aggs: List[Aggregation]) -> List[Dict[str, Any]]:
+    """Agrega las muestras crudas en buckets de `seconds`."""
+    needed = _needed(aggs)
+    group: Dict[str, Any] = {"_id": truncate_date("$samples.t", seconds)}
+    for index, name in enumerate(channels):
+        value = f"$samples.v.{name}"
+        accumulators = {
+            "min": {"$min": value},
+            "max": {"$max": value},
+            "sum": {"$sum": value},
+            "count": {"$sum": {"$cond": [_missing(value), 0, 1]}},
+            "last": {"$max": {"$cond": [_missing(value), None, {"t": "$samples.t", "v": value}]}},
+        }
+        group.update({f"c{index}_{key}": acc for key, acc in accumulators.items() if key in needed})
+    return _raw_match(device, channels, start, end) + [
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+        {"$project": _output(channels, aggs)},
+    ]
+
+
+async def stream_readings(device: str, channels: List[str], start: datetime, end: datetime,
+                          resolution: str, interval: int | None, aggs: List[Aggregation]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Itera los puntos de una consulta desde el cursor de agregación, sin
+    materializar el resultado. `resolution` es la colección de origen y
+    `interval` el tamaño (s) de los buckets de salida; sin `interval` y con
+    origen "raw" se devuelven las muestras tal cual.
+    """
+    database = await get_database()
+    if resolution == RAW_RESOLUTION:
+        collection = database[CollectionNames.READINGS.value]
+        if interval is None:
+            pipeline = _raw_points_pipeline(device, channels, start, end)
+        else:
+            pipeline = _raw_grouped_pipeline(device, channels, start, end, interval, aggs)
+    else:
+        source_seconds, source = RESOLUTIONS[resolution]
+        collection = database[source.value]
+        pipeline = _rollup_pipeline(device, channels, start, end, interval or source_seconds, source_seconds, aggs)
+
+    cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=settings.QUERY_BATCH_SIZE)
+    async for document in cursor:
+        yield document
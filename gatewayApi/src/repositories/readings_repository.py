@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from src.core.config import settings
+from src.database.connection import get_database
+from src.models.model import CollectionNames
+from src.util.frame import FrameRow
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Código de error de MongoDB para clave duplicada
+DUPLICATE_KEY = 11000
+
+# Clave de un bucket: (dispositivo, grupo de canales, inicio del bucket)
+BucketKey = Tuple[str, str, datetime]
+
+def bucket_start(timestamp: float, bucket_seconds: int) -> datetime:
+    """Inicio (UTC) del bucket que contiene `timestamp`."""
+    return datetime.fromtimestamp(timestamp - timestamp % bucket_seconds, tz=timezone.utc)
+
+
+def group_rows(rows: Iterable[FrameRow], group: str, bucket_seconds: int) -> Dict[BucketKey, List[Dict[str, Any]]]:
+    """
+    Agrupa las filas por bucket. Cada muestra del bucket es
+    {"t": instante, "v": {canal: valor}} y "q" solo si hay calidad no buena.
+    """
+    buckets: Dict[BucketKey, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        sample = {"t": datetime.fromtimestamp(row.timestamp, tz=timezone.utc), "v": row.values}
+        if row.quality:
+            sample["q"] = row.quality
+        buckets[(row.device, group, bucket_start(row.timestamp, bucket_seconds))].append(sample)
+    return buckets
+
+
+def _batches(operations: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(operations), size):
+        yield operations[start:start + size]
+
+
+def _bucket_update(key: BucketKey, samples: List[Dict[str, Any]]) -> UpdateOne:
+    """Upsert que añade `samples` al bucket (lo crea si no existe)."""
+    device, group, start = key
+    return UpdateOne(
+        {"device": device, "group": group, "bucket": start},
+        {
+            "$push": {"samples": {"$each": samples}},
+            "$inc": {"count": len(samples)},
+            "$min": {"first": min(sample["t"] for sample in samples)},
+            "$max": {"last": max(sample["t"] for sample in samples)},
+        },
+        upsert=True,
+    )
+
+
+async def _write_updates(collection, updates: List[Tuple[UpdateOne, int]]) -> Tuple[int, int]:
+    """
+    Aplica (operación, filas) con bulk_write no ordenado en lotes de
+    READINGS_BATCH_SIZE.
+
+    :return: (buckets creados o actualizados, filas guardadas).
+    """
+    buckets = stored = 0
+    for batch in _batches(updates, settings.READINGS_BATCH_SIZE):
+        try:
+            result = await collection.bulk_write([operation for operation, _ in batch], ordered=False)
+            buckets += result.upserted_count + result.modified_count
+            stored += sum(count for _, count in batch)
+        except BulkWriteError as e:
+            # ordered=False: el resto del lote se aplicó igualmente
+            details = e.details
+            failed = {error["index"] for error in details.get("writeErrors", [])}
+            buckets += details.get("nUpserted", 0) + details.get("nModified", 0)
+            stored += sum(count for index, (_, count) in enumerate(batch) if index not in failed)
+            logger.error(f"Errores al escribir buckets de lecturas: {details.get('writeErrors', [])[:3]}")
+    return buckets, stored
+
+
+async def upsert_readings(rows: Iterable[FrameRow], group: str | None = None) -> Tuple[int, int]:
+    """
+    Añade lecturas a sus buckets con bulk_write no ordenado: una operación
+    UpdateOne (upsert + $push) por bucket, en lotes de READINGS_BATCH_SIZE.
+
+    :return: (buckets creados o actualizados, filas guardadas).
+    """
+    group = group or settings.READINGS_DEFAULT_GROUP
+    buckets = group_rows(rows, group, settings.READINGS_BUCKET_SECONDS)
+    updates = [(_bucket_update(key, samples), len(samples)) for key, samples in buckets.items()]
+    if not updates:
+        return 0, 0
+
+    database = await get_database()
+    return await _write_updates(database[CollectionNames.READINGS.value], updates)
+
+
+async def insert_reading_buckets(rows: Iterable[FrameRow], group: str | None = None) -> Tuple[int, int]:
+    """
+    Inserta buckets completos con insert_many no ordenado (cargas históricas
+    de intervalos ya cerrados). Los buckets que ya existen (datos reenviados o
+    que solapan con la ingesta normal) se rechazan por el índice único y se
+    completan con el mismo upsert que upsert_readings.
+
+    :return: (buckets creados o actualizados, filas guardadas).
+    """
+    group = group or settings.READINGS_DEFAULT_GROUP
+    buckets = group_rows(rows, group, settings.READINGS_BUCKET_SECONDS)
+    items = list(buckets.items())
+    if not items:
+        return 0, 0
+
+    database = await get_database()
+    collection = database[CollectionNames.READINGS.value]
+    written = stored = 0
+    existing: List[Tuple[UpdateOne, int]] = []
+    for batch in _batches(items, settings.READINGS_BATCH_SIZE):
+        documents = [
+            {
+                "device": device,
+                "group": group_name,
+                "bucket": start,
+                "samples": samples,
+                "count": len(samples),
+                "first": min(sample["t"] for sample in samples),
+                "last": max(sample["t"] for sample in samples),
+            }
+            for (device, group_name, start), samples in batch
+        ]
+        try:
+            result = await collection.insert_many(documents, ordered=False)
+            written += len(result.inserted_ids)
+            stored += sum(len(samples) for _, samples in batch)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicated = {error["index"] for error in errors if error.get("code") == DUPLICATE_KEY}
+            failed = {error["index"] for error in errors} - duplicated
+            written += e.details.get("nInserted", 0)
+            stored += sum(len(samples) for index, (_, samples) in enumerate(batch) if index not in duplicated | failed)
+            existing.extend((_bucket_update(*batch[index]), len(batch[index][1])) for index in sorted(duplicated))
+            if failed:
+                logger.error(f"Errores al insertar buckets de lecturas: {[error for error in errors if error['index'] in failed][:3]}")
+
+    if existing:
+        logger.info(f"{len(existing)} buckets ya existían; se completan con upsert")
+        updated, merged = await _write_updates(collection, existing)
+        written += updated
+        stored += merged
+    return written, stored
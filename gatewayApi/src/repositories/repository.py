@@ -1,5 +1,5 @@
 from typing import Dict, Any
-from src.database.connection import get_database, close_connection
+from src.database.connection import get_database
 from src.util.logging import get_logger
 from bson import ObjectId
 
@@ -16,8 +16,6 @@ async def get_document_by_dict(data: Dict[str, str] , collection: str) -> Dict[s
 
     except Exception as e:
         logger.error(f"Error al obtener el usuario por nombre de usuario: {e}")
-    finally:
-        await close_connection()
 
     return None
 
@@ -30,6 +28,15 @@ async def insert_data(data: Dict, collection: str) -> ObjectId | None:
     
     except Exception as e:
         logger.error(f"Error al crear el usuario: {e}")
-    finally:
-        await close_connection()
-    return None
\ No newline at end of file
+    return None
+
+async def update_data(query: Dict, changes: Dict, collection: str) -> bool:
+    """Aplica `$set` con `changes` al documento que cumple `query`."""
+    try:
+        Database = await get_database()
+        result = await Database[collection].update_one(query, {"$set": changes})
+        return result.matched_count > 0
+
+    except Exception as e:
+        logger.error(f"Error al actualizar el documento: {e}")
+    return False
@@ -0,0 +1,347 @@
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from pymongo import ASCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from src.core.config import settings
+from src.database.connection import get_database
+from src.models.model import CollectionNames
+from src.repositories.readings_repository import bucket_start
+from src.util.energy import EnergyByInterval, EnergyIntegrator, by_bucket
+from src.util.frame import FrameRow
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Resoluciones de rollup de la más fina a la más gruesa: nombre -> (segundos, colección)
+RESOLUTIONS: Dict[str, Tuple[int, CollectionNames]] = {
+    "1m": (60, CollectionNames.ROLLUP_1M),
+    "15m": (900, CollectionNames.ROLLUP_15M),
+    "1h": (3600, CollectionNames.ROLLUP_1H),
+    "1d": (86400, CollectionNames.ROLLUP_1D),
+}
+RAW_RESOLUTION = "raw"
+
+
+@dataclass
+class Partial:
+    """Agregado parcial de un canal en un bucket."""
+    min: float
+    max: float
+    sum: float
+    count: int
+    last: float
+    last_t: datetime
+
+    def add(self, value: float, t: datetime) -> None:
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+        if t >= self.last_t:
+            self.last = value
+            self.last_t = t
+
+
+# {(dispositivo, inicio del bucket): {canal: Partial}}
+Partials = Dict[Tuple[str, datetime], Dict[str, Partial]]
+
+
+def _valid_channel(name: str) -> bool:
+    # Los nombres de canal se usan como claves de subdocumento
+    return bool(name) and "." not in name and not name.startswith("$")
+
+
+def compute_partials(rows: Iterable[FrameRow], seconds: int) -> Partials:
+    """Agrega las filas por dispositivo y bucket de `seconds`, ignorando valores no finitos."""
+    partials: Partials = defaultdict(dict)
+    for row in rows:
+        t = datetime.fromtimestamp(row.timestamp, tz=timezone.utc)
+        channels = partials[(row.device, bucket_start(row.timestamp, seconds))]
+        for name, value in row.values.items():
+            if not isinstance(value, (int, float)) or not math.isfinite(value):
+                continue
+            partial = channels.get(name)
+            if partial is None:
+                if not _valid_channel(name):
+                    continue
+                channels[name] = Partial(value, value, value, 1, value, t)
+            else:
+                partial.add(value, t)
+    return partials
+
+
+def _merge_update(channels: Dict[str, Partial], energy: Dict[str, float]) -> List[Dict[str, Any]]:
+    """
+    Update con pipeline (MongoDB >= 4.2) que funde los parciales en el
+    documento: $min/$max, suma y cuenta acumuladas y `last` solo si el
+    instante es posterior al guardado. Las referencias "$..." leen el
+    documento anterior, así que todo cabe en una sola etapa; los
+    subdocumentos se fusionan con los campos que ya tuviera el canal.
+    """
+    stage: Dict[str, Any] = {"updated_at": "$$NOW"}
+    for name in channels.keys() | energy.keys():
+        base = f"$channels.{name}"
+        fields: Dict[str, Any] = {}
+        p = channels.get(name)
+        if p is not None:
+            fields.update({
+                "min": {"$min": [f"{base}.min", p.min]},
+                "max": {"$max": [f"{base}.max", p.max]},
+                "sum": {"$add": [{"$ifNull": [f"{base}.sum", 0]}, p.sum]},
+                "count": {"$add": [{"$ifNull": [f"{base}.count", 0]}, p.count]},
+                "last": {"$cond": [{"$gte": [p.last_t, {"$ifNull": [f"{base}.last_t", EPOCH]}]}, p.last, f"{base}.last"]},
+                "last_t": {"$max": [f"{base}.last_t", p.last_t]},
+            })
+        if name in energy:
+            fields["energy_kwh"] = {"$add": [{"$ifNull": [f"{base}.energy_kwh", 0]}, energy[name]]}
+        stage[f"channels.{name}"] = fields
+    return [{"$set": stage}]
+
+
+async def _bulk(collection_name: str, operations: List[Any]) -> int:
+    if not operations:
+        return 0
+    database = await get_database()
+    collection = database[collection_name]
+    written = 0
+    for start in range(0, len(operations), settings.READINGS_BATCH_SIZE):
+        batch = operations[start:start + settings.READINGS_BATCH_SIZE]
+        try:
+            result = await collection.bulk_write(batch, ordered=False)
+            written += result.upserted_count + result.modified_count
+        except BulkWriteError as e:
+            details = e.details
+            written += details.get("nUpserted", 0) + details.get("nModified", 0)
+            logger.error(f"Errores al escribir rollups en {collection_name}: {details.get('writeErrors', [])[:3]}")
+    return written
+
+
+async def merge_rollups(rows: List[FrameRow], energy: EnergyByInterval | None = None) -> int:
+    """Funde un lote de lecturas y su energía integrada en todas las resoluciones de rollup."""
+    written = 0
+    for seconds, collection in RESOLUTIONS.values():
+        partials = compute_partials(rows, seconds)
+        energy_buckets = {
+            (device, datetime.fromtimestamp(start, tz=timezone.utc)): kwh
+            for (device, start), kwh in by_bucket(energy or {}, seconds).items()
+        }
+        operations = [
+            UpdateOne(
+                {"device": device, "bucket": bucket},
+                _merge_update(partials.get((device, bucket), {}), energy_buckets.get((device, bucket), {})),
+                upsert=True,
+            )
+            for device, bucket in partials.keys() | energy_buckets.keys()
+            if partials.get((device, bucket)) or energy_buckets.get((device, bucket))
+        ]
+        written += await _bulk(collection.value, operations)
+    return written
+
+
+def _utc(value: datetime) -> datetime:
+    # Motor devuelve fechas naive (en UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _bucket_after(value: datetime, seconds: int) -> datetime:
+    """Fin del bucket de `seconds` que contiene `value`."""
+    return datetime.fromtimestamp(bucket_start(value.timestamp(), seconds).timestamp() + seconds, tz=timezone.utc)
+
+
+def truncate_date(field: str, seconds: int) -> Dict[str, Any]:
+    """Inicio del bucket de la fecha `field` ($dateTrunc no existe en MongoDB 4.2)."""
+    ms = seconds * 1000
+    return {"$toDate": {"$subtract": [{"$toLong": field}, {"$mod": [{"$toLong": field}, ms]}]}}
+
+
+def dedupe_samples() -> List[Dict[str, Any]]:
+    """
+    Etapas que dejan una muestra por (grupo, instante) tras el $unwind de
+    `samples`, descartando los duplicados de reenvíos del gateway. La salida
+    mantiene la forma {"samples": {"t", "v"}}.
+    """
+    return [
+        {"$group": {"_id": {"g": "$group", "t": "$samples.t"}, "v": {"$first": "$samples.v"}}},
+        {"$project": {"_id": 0, "samples": {"t": "$_id.t", "v": "$v"}}},
+    ]
+
+
+def _raw_pipeline(device: str, start: datetime, end: datetime, seconds: int) -> List[Dict[str, Any]]:
+    """Agrega desde los buckets crudos los rollups de [start, end) a `seconds`."""
+    return [
+        {"$match": {"device": device, "bucket": {"$gte": bucket_start(start.timestamp(), settings.READINGS_BUCKET_SECONDS), "$lt": end}}},
+        {"$unwind": "$samples"},
+        {"$match": {"samples.t": {"$gte": start, "$lt": end}}},
+        *dedupe_samples(),
+        {"$sort": {"samples.t": 1}},
+        {"$project": {"t": "$samples.t", "kv": {"$objectToArray": "$samples.v"}}},
+        {"$unwind": "$kv"},
+        {"$match": {"kv.v": {"$gt": float("-inf"), "$lt": float("inf")}}},
+        {"$group": {
+            "_id": {"bucket": truncate_date("$t", seconds), "channel": "$kv.k"},
+            "min": {"$min": "$kv.v"},
+            "max": {"$max": "$kv.v"},
+            "sum": {"$sum": "$kv.v"},
+            "count": {"$sum": 1},
+            "last": {"$last": "$kv.v"},
+            "last_t": {"$last": "$t"},
+        }},
+    ]
+
+
+def _coarsen_pipeline(device: str, start: datetime, end: datetime, seconds: int) -> List[Dict[str, Any]]:
+    """Agrega los rollups de la resolución anterior (más fina) a buckets de `seconds`."""
+    return [
+        {"$match": {"device": device, "bucket": {"$gte": start, "$lt": end}}},
+        {"$project": {"bucket": 1, "kv": {"$objectToArray": "$channels"}}},
+        {"$unwind": "$kv"},
+        {"$group": {
+            "_id": {"bucket": truncate_date("$bucket", seconds), "channel": "$kv.k"},
+            "min": {"$min": "$kv.v.min"},
+            "max": {"$max": "$kv.v.max"},
+            "sum": {"$sum": "$kv.v.sum"},
+            "count": {"$sum": "$kv.v.count"},
+            # El documento {t, v} con mayor t es el último valor
+            "last": {"$max": {"t": "$kv.v.last_t", "v": "$kv.v.last"}},
+            "energy_kwh": {"$sum": "$kv.v.energy_kwh"},
+        }},
+    ]
+
+
+async def _recompute_energy(database, device: str, start: datetime, end: datetime,
+                            integrator: EnergyIntegrator) -> EnergyByInterval:
+    """
+    Vuelve a integrar la energía de [start, end) desde los datos crudos con un
+    integrador sin estado. Se leen también las muestras vecinas (hasta max_gap)
+    para que los tramos que cruzan los extremos queden completos.
+    """
+    if not integrator.channels:
+        return {}
+    margin = max(integrator.max_gap, settings.READINGS_BUCKET_SECONDS)
+    low = start.timestamp() - margin
+    high = datetime.fromtimestamp(end.timestamp() + margin, tz=timezone.utc)
+    cursor = database[CollectionNames.READINGS.value].find(
+        {"device": device, "bucket": {"$gte": bucket_start(low, settings.READINGS_BUCKET_SECONDS), "$lt": high}},
+        {"samples": 1},
+    )
+    rows: List[FrameRow] = []
+    async for document in cursor:
+        for sample in document["samples"]:
+            values = {name: sample["v"][name] for name in integrator.channels.intersection(sample["v"])}
+            if values:
+                rows.append(FrameRow(device, _utc(sample["t"]).timestamp(), values))
+    rows.sort(key=lambda row: row.timestamp)
+
+    replica = integrator.fresh()
+    energy = replica.integrate(rows)
+    # El estado del integrador principal avanza hasta lo ya recalculado
+    for (owner, name), (t, power) in replica.state.items():
+        integrator.advance(owner, name, t, power)
+    return {key: kwh for key, kwh in energy.items() if start.timestamp() <= key[2] < end.timestamp()}
+
+
+async def _replace_buckets(collection: CollectionNames, device: str, buckets: Dict[datetime, Dict[str, Any]]) -> int:
+    now = datetime.now(timezone.utc)
+    operations = [
+        ReplaceOne(
+            {"device": device, "bucket": bucket},
+            {"device": device, "bucket": bucket, "channels": channels, "updated_at": now},
+            upsert=True,
+        )
+        for bucket, channels in buckets.items()
+    ]
+    return await _bulk(collection.value, operations)
+
+
+async def recompute_rollups(device: str, start: datetime, end: datetime, integrator: EnergyIntegrator) -> int:
+    """
+    Recalcula solo los buckets de rollup que cubren [start, end] (datos que
+    llegan tarde o backfill): la resolución más fina desde los datos crudos y
+    cada una de las siguientes desde la anterior.
+    """
+    database = await get_database()
+    resolutions = list(RESOLUTIONS.values())
+
+    seconds, collection = resolutions[0]
+    first, last = bucket_start(start.timestamp(), seconds), _bucket_after(end, seconds)
+    buckets: Dict[datetime, Dict[str, Any]] = defaultdict(dict)
+    async for item in database[CollectionNames.READINGS.value].aggregate(_raw_pipeline(device, first, last, seconds), allowDiskUse=True):
+        key = item.pop("_id")
+        item["last_t"] = _utc(item["last_t"])
+        buckets[_utc(key["bucket"])][key["channel"]] = item
+    energy = await _recompute_energy(database, device, first, last, integrator)
+    for (_, bucket), channels in by_bucket(energy, seconds).items():
+        for name, kwh in channels.items():
+            buckets[datetime.fromtimestamp(bucket, tz=timezone.utc)].setdefault(name, {})["energy_kwh"] = kwh
+    written = await _replace_buckets(collection, device, buckets)
+
+    previous = collection
+    for seconds, collection in resolutions[1:]:
+        first, last = bucket_start(start.timestamp(), seconds), _bucket_after(end, seconds)
+        buckets = defaultdict(dict)
+        async for item in database[previous.value].aggregate(_coarsen_pipeline(device, first, last, seconds)):
+            key = item.pop("_id")
+            last_value = item.pop("last")
+            if "t" in last_value:
+                item["last"], item["last_t"] = last_value.get("v"), _utc(last_value["t"])
+            if key["channel"] not in integrator.channels:
+                item.pop("energy_kwh")
+            buckets[_utc(key["bucket"])][key["channel"]] = {k: v for k, v in item.items() if v is not None}
+        written += await _replace_buckets(collection, device, buckets)
+        previous = collection
+
+    logger.info(f"Rollups recalculados para {device} entre {start} y {end}: {written} buckets")
+    return written
+
+
+def choose_resolution(start: datetime, end: datetime, max_points: int, step: Optional[int] = None) -> str:
+    """
+    Resolución de origen de una consulta. Con `step` (s), la más gruesa cuyo
+    bucket divide el paso, de modo que cada punto sale de buckets enteros. Sin
+    él, la más fina que da como mucho `max_points` buckets en el rango: se
+    leen como mucho `max_points` documentos y no hace falta re-agregar (si
+    ninguna cabe, la más gruesa). Si el paso pedido es menor que el rollup más
+    fino se usan los datos crudos.
+    """
+    span = max(0.0, (end - start).total_seconds())
+    target = step if step else span / max(1, max_points)
+    names = list(RESOLUTIONS)
+    if target < RESOLUTIONS[names[0]][0]:
+        return RAW_RESOLUTION
+    if step:
+        divisors = [name for name in names if step % RESOLUTIONS[name][0] == 0]
+        return divisors[-1] if divisors else RAW_RESOLUTION
+    return next((name for name in names if RESOLUTIONS[name][0] >= target), names[-1])
+
+
+async def get_rollups(device: str, start: datetime, end: datetime, resolution: str) -> List[Dict[str, Any]]:
+    """Documentos de rollup de un dispositivo en [start, end) ordenados por bucket."""
+    seconds, collection = RESOLUTIONS[resolution]
+    database = await get_database()
+    cursor = database[collection.value].find(
+        {"device": device, "bucket": {"$gte": bucket_start(start.timestamp(), seconds), "$lt": end}},
+        {"_id": 0},
+    ).sort("bucket", ASCENDING)
+    return await cursor.to_list(length=None)
+
+
+async def get_latest_values(days: int = 2) -> AsyncIterator[Tuple[str, str, float, datetime]]:
+    """
+    Último valor de cada (dispositivo, canal) según los rollups diarios de los
+    últimos `days` días: (dispositivo, canal, valor, instante).
+    """
+    seconds, collection = RESOLUTIONS["1d"]
+    since = datetime.fromtimestamp(bucket_start(datetime.now(timezone.utc).timestamp(), seconds).timestamp() - (days - 1) * seconds, tz=timezone.utc)
+    database = await get_database()
+    cursor = database[collection.value].find({"bucket": {"$gte": since}}, {"_id": 0, "device": 1, "channels": 1})
+    async for document in cursor:
+        for name, channel in document.get("channels", {}).items():
+            if channel.get("last_t") is not None:
+                yield document["device"], name, channel["last"], _utc(channel["last_t"])
@@ -0,0 +1,43 @@
+"""
+Rutas de últimos valores (tabla en memoria)
+"""
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from src.auth.dependencies import verify_token_only
+from src.services.latest_service import latest_table
+
+router = APIRouter(prefix="/api/ems", tags=["Latest"])
+
+
+@router.get(
+    "/latest",
+    status_code=status.HTTP_200_OK,
+    summary="Últimos valores de todos los dispositivos",
+    description="Valor actual de cada canal con su instante y si está obsoleto; no consulta la base de datos"
+)
+async def get_latest_all(token: None = Depends(verify_token_only)) -> List[Dict[str, Any]]:
+    """
+    **Códigos de estado:**
+    - **200**: Lista de dispositivos
+    - **401**: Token inválido o no proporcionado
+    """
+    return latest_table.all()
+
+
+@router.get(
+    "/latest/{device}",
+    status_code=status.HTTP_200_OK,
+    summary="Últimos valores de un dispositivo",
+    description="Valor actual de cada canal del dispositivo con su instante y si está obsoleto"
+)
+async def get_latest_device(device: str, token: None = Depends(verify_token_only)) -> Dict[str, Any]:
+    """
+    **Códigos de estado:**
+    - **200**: Últimos valores del dispositivo
+    - **401**: Token inválido o no proporcionado
+    - **404**: Dispositivo sin lecturas
+    """
+    latest = latest_table.get(device)
+    if latest is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Sin lecturas del dispositivo {device}")
+    return latest
@@ -0,0 +1,54 @@
+"""
+Rutas de lecturas en vivo (Server-Sent Events)
+"""
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from src.auth.dependencies import verify_stream_token
+from src.services.live_service import live_hub
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/ems", tags=["Live"])
+
+
+def _split(values: List[str]) -> List[str]:
+    return [name.strip() for item in values for name in item.split(",") if name.strip()]
+
+
+@router.get(
+    "/live",
+    status_code=status.HTTP_200_OK,
+    summary="Lecturas en vivo",
+    description="Flujo SSE con los valores que cambian en los dispositivos y canales suscritos",
+    response_class=StreamingResponse,
+)
+async def get_live(
+    devices: List[str] = Query(..., description="Dispositivos (repetidos o separados por comas)"),
+    channels: List[str] = Query(default=[], description="Canales; vacío para todos"),
+    token: None = Depends(verify_stream_token)
+) -> StreamingResponse:
+    """
+    Endpoint de suscripción a lecturas en vivo.
+
+    Envía primero un evento `snapshot` por dispositivo con los valores actuales
+    y después eventos `readings` solo con los canales que cambian. Si el
+    cliente no consume a tiempo se descartan los cambios intermedios y recibe
+    un nuevo `snapshot`.
+
+    **Códigos de estado:**
+    - **200**: Flujo text/event-stream
+    - **400**: Sin dispositivos
+    - **401**: Token inválido o no proporcionado
+    """
+    names = _split(devices)
+    if not names:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debe indicarse al menos un dispositivo")
+    client = live_hub.subscribe(names, _split(channels))
+    logger.debug(f"Cliente en vivo suscrito a {client.groups}")
+    return StreamingResponse(
+        live_hub.stream(client),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
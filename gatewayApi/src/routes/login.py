@@ -4,6 +4,8 @@ Rutas de autenticación para el sistema EMS
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
+from src.auth.dependencies import CurrentUser, oauth2_scheme
+from src.auth.security import PasswordPoolBusy, RevocationListFull, revoke_token, verify_token
 from src.models.model import UserLogin, UserLoginResponse, KeysNames
 from src.services.service import authenticate_user
 from src.util.logging import get_logger
@@ -43,6 +45,7 @@ async def login_user(
     - **401**: Credenciales inválidas
     - **422**: Error de validación de datos
     - **500**: Error interno del servidor
+    - **503**: Demasiados logins simultáneos
     """
     try:
         # Preparar las credenciales para el servicio
@@ -68,6 +71,13 @@ async def login_user(
     except HTTPException:
         # Re-raise HTTPException para mantener el código de estado
         raise
+    except PasswordPoolBusy:
+        logger.warning(f"Login rechazado por saturación del pool de contraseñas: {form_data.username}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, inténtalo de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         logger.error(f"Error interno durante la autenticación: {e}")
         raise HTTPException(
@@ -124,3 +134,44 @@ async def refresh_token_endpoint(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor al refrescar token"
         )
+
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Cerrar sesión",
+    description="Revoca el token de acceso (y el de refresco si se indica) hasta su expiración"
+)
+async def logout_user(
+    current_user: CurrentUser,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    refresh_token: str | None = None
+) -> None:
+    """
+    Endpoint para revocar tokens. Requiere un token de acceso válido; el
+    token de refresco solo se revoca si es válido y del mismo usuario.
+
+    **Códigos de estado:**
+    - **204**: Tokens revocados
+    - **401**: Token de acceso o de refresco inválido
+    - **503**: Lista de revocados llena; los tokens siguen siendo válidos
+    """
+    if refresh_token:
+        payload = verify_token(refresh_token, "refresh")
+        if payload is None or payload.get("sub") != current_user.username:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de refresco inválido o expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    try:
+        if refresh_token:
+            revoke_token(refresh_token, "refresh")
+        revoke_token(token)
+    except RevocationListFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No se pudo revocar el token, inténtalo más tarde",
+            headers={"Retry-After": "60"},
+        )
@@ -0,0 +1,87 @@
+"""
+Rutas de métricas internas de la API
+"""
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, status
+from src.auth.dependencies import verify_token_only
+from src.auth.security import get_password_pool_stats, get_token_cache_stats
+from src.database.connection import get_pool_stats
+from src.database.indexes import get_index_report
+from src.services.user_service import get_user_cache_stats
+
+router = APIRouter(prefix="/api/ems/metrics", tags=["Metrics"])
+
+
+@router.get(
+    "/db",
+    status_code=status.HTTP_200_OK,
+    summary="Métricas del pool de MongoDB",
+    description="Conexiones abiertas y en uso, fallos y latencia de checkout del pool"
+)
+async def get_db_metrics(token: None = Depends(verify_token_only)) -> Dict[str, Any]:
+    """
+    **Códigos de estado:**
+    - **200**: Métricas del pool
+    - **401**: Token inválido o no proporcionado
+    """
+    return get_pool_stats()
+
+
+@router.get(
+    "/indexes",
+    status_code=status.HTTP_200_OK,
+    summary="Estado de los índices",
+    description="Índices creados al arrancar, deriva respecto a los declarados y errores"
+)
+async def get_index_metrics(token: None = Depends(verify_token_only)) -> Dict[str, Any]:
+    """
+    **Códigos de estado:**
+    - **200**: Informe de la última verificación
+    - **401**: Token inválido o no proporcionado
+    """
+    return get_index_report()
+
+
+@router.get(
+    "/cache/users",
+    status_code=status.HTTP_200_OK,
+    summary="Métricas de la caché de usuarios",
+    description="Aciertos, fallos, expulsiones y tamaño de la caché de usuarios autenticados"
+)
+async def get_user_cache_metrics(token: None = Depends(verify_token_only)) -> Dict[str, Any]:
+    """
+    **Códigos de estado:**
+    - **200**: Métricas de la caché
+    - **401**: Token inválido o no proporcionado
+    """
+    return get_user_cache_stats()
+
+
+@router.get(
+    "/cache/tokens",
+    status_code=status.HTTP_200_OK,
+    summary="Métricas de la caché de tokens",
+    description="Tamaño, aciertos y fallos de la caché de claims JWT verificados y tokens revocados"
+)
+async def get_token_cache_metrics(token: None = Depends(verify_token_only)) -> Dict[str, Any]:
+    """
+    **Códigos de estado:**
+    - **200**: Métricas de la caché
+    - **401**: Token inválido o no proporcionado
+    """
+    return get_token_cache_stats()
+
+
+@router.get(
+    "/passwords",
+    status_code=status.HTTP_200_OK,
+    summary="Métricas del pool de contraseñas",
+    description="Operaciones bcrypt activas, en espera, completadas y rechazadas por saturación"
+)
+async def get_password_metrics(token: None = Depends(verify_token_only)) -> Dict[str, Any]:
+    """
+    **Códigos de estado:**
+    - **200**: Métricas del pool
+    - **401**: Token inválido o no proporcionado
+    """
+    return get_password_pool_stats()
@@ -0,0 +1,98 @@
+"""
+Rutas para la ingesta y consulta de lecturas de los gateways
+"""
+from datetime import datetime
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from src.auth.dependencies import get_current_user, verify_token_only
+from src.core.config import settings
+from src.models.model import Aggregation, ReadingsIngestResponse, User
+from src.services.query_service import AUTO_RESOLUTION, plan_query, query_readings
+from src.services.readings_service import ingest_readings
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/ems", tags=["Readings"])
+
+
+@router.post(
+    "/readings",
+    response_model=ReadingsIngestResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Ingerir lecturas",
+    description="Recibe un lote de lecturas en trama binaria (application/octet-stream) o JSON"
+)
+async def post_readings(
+    request: Request,
+    group: str | None = Query(default=None, description="Grupo de canales del lote"),
+    backfill: bool = Query(default=False, description="Carga histórica de buckets completos"),
+    token: None = Depends(verify_token_only)
+) -> ReadingsIngestResponse:
+    """
+    Endpoint para guardar lecturas de un gateway.
+
+    **Códigos de estado:**
+    - **200**: Lote guardado
+    - **400**: Trama inválida
+    - **401**: Token inválido o no proporcionado
+    - **500**: Error interno del servidor
+    """
+    payload = await request.body()
+    try:
+        return await ingest_readings(payload, group=group, backfill=backfill)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error en la ingesta de lecturas: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al guardar lecturas"
+        )
+
+
+@router.get(
+    "/readings",
+    status_code=status.HTTP_200_OK,
+    summary="Consultar lecturas",
+    description="Devuelve puntos agregados de un dispositivo como NDJSON (una línea JSON por punto)",
+    response_class=StreamingResponse,
+)
+async def get_readings(
+    device: str = Query(..., description="Dispositivo"),
+    channels: List[str] = Query(..., description="Canales (repetidos o separados por comas)"),
+    start: datetime = Query(..., description="Inicio del rango (ISO 8601, UTC si no lleva zona)"),
+    end: datetime = Query(..., description="Fin del rango (exclusivo)"),
+    resolution: str = Query(default=AUTO_RESOLUTION, description="auto, raw, 1m, 15m, 1h o 1d"),
+    interval: int | None = Query(default=None, description="Tamaño en segundos de cada punto"),
+    aggs: List[Aggregation] = Query(default=[Aggregation.AVG], description="Agregados por canal"),
+    max_points: int = Query(default=settings.ROLLUP_MAX_POINTS, ge=1, description="Puntos máximos con resolution=auto o con interval"),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Endpoint para consultar el histórico de lecturas.
+
+    **Códigos de estado:**
+    - **200**: Flujo NDJSON con {"t": ..., "<canal>": {"<agregado>": valor}}
+    - **400**: Parámetros inválidos
+    - **401**: Token inválido o no proporcionado
+    - **500**: Error interno del servidor
+    """
+    try:
+        plan = plan_query(device, channels, start, end, resolution, interval, aggs, max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        stream = await query_readings(plan)
+    except Exception as e:
+        logger.error(f"Error en la consulta de lecturas: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al consultar lecturas"
+        )
+    return StreamingResponse(
+        stream,
+        media_type="application/x-ndjson",
+        headers={"X-Resolution": plan.resolution, "X-Interval": str(plan.interval or "")},
+    )
@@ -0,0 +1,113 @@
+"""
+Benchmark de logins concurrentes: throughput de verificación de contraseñas y
+latencia del bucle de eventos, con bcrypt dentro del bucle (llamada síncrona,
+como antes) o en el pool acotado (verify_password_async).
+
+Una sonda duerme `--tick` ms en bucle y mide cuánto se retrasa cada despertar.
+Con bcrypt en el bucle el retraso crece con cada login simultáneo; con el pool
+debe mantenerse plano. Los logins que el pool rechaza por saturación (503 en
+la API) se cuentan aparte.
+
+Uso:
+    uv run -m src.scripts.benchmark_login --concurrency 1 8 32 --logins 64 --output login.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from src.auth.security import PasswordPoolBusy, hash_password, verify_password, verify_password_async
+from src.core.config import settings
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+async def probe(tick: float, lags: List[float], stop: asyncio.Event) -> None:
+    """Registra el retraso (ms) de cada despertar respecto a lo pedido."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append((time.perf_counter() - start - tick) * 1000)
+
+
+async def measure(mode: str, hashed: str, concurrency: int, logins: int, tick: float) -> Dict[str, Any]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(tick, lags, stop))
+    slots = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login() -> None:
+        nonlocal rejected
+        async with slots:
+            if mode == "event_loop":
+                verify_password(PASSWORD, hashed)
+                await asyncio.sleep(0)
+            else:
+                try:
+                    await verify_password_async(PASSWORD, hashed)
+                except PasswordPoolBusy:
+                    rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "logins": logins,
+        "rejected": rejected,
+        "logins_per_second": round((logins - rejected) / elapsed, 2),
+        "loop_lag_ms": {"p50": percentile(lags, 0.5), "p99": percentile(lags, 0.99), "max": percentile(lags, 1.0)},
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    hashed = hash_password(PASSWORD)
+    results = []
+    for concurrency in args.concurrency:
+        for mode in ("event_loop", "pool"):
+            results.append(await measure(mode, hashed, concurrency, args.logins, args.tick / 1000))
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de logins concurrentes (bcrypt)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--logins", type=int, default=64, help="Logins por medida")
+    parser.add_argument("--tick", type=float, default=5.0, help="Periodo de la sonda del bucle (ms)")
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "parameters": {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "queue_timeout_seconds": settings.PASSWORD_QUEUE_TIMEOUT_SECONDS,
+            "logins": args.logins,
+            "tick_ms": args.tick,
+        },
+        "results": asyncio.run(run(args)),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
@@ -20,9 +20,12 @@ async def init_admin():
         KeysNames.EMAIL: email_admin
     }
 
-    created_user = await create_user(user_data)
-    if created_user:
-        logger.info(f"Usuario admin creado exitosamente: {created_user.username}")
+    try:
+        created_user = await create_user(user_data)
+        if created_user:
+            logger.info(f"Usuario admin creado exitosamente: {created_user.username}")
+    finally:
+        await close_connection()
         
 if __name__ == "__main__":
     asyncio.run(init_admin())
@@ -0,0 +1,96 @@
+"""
+Tabla en memoria con el último valor de cada dispositivo y canal.
+
+Se carga al arrancar desde los rollups diarios y se actualiza en la ingesta,
+así que las consultas de "valor actual" no llegan a MongoDB.
+"""
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.core.config import settings
+from src.repositories.rollup_repository import get_latest_values
+from src.util.frame import FrameRow
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+@dataclass
+class DeviceLatest:
+    """Últimos valores de un dispositivo: {canal: (valor, instante)}."""
+    channels: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    updated: float = 0.0
+
+    def update(self, name: str, value: float, timestamp: float) -> None:
+        current = self.channels.get(name)
+        if current is None or timestamp >= current[1]:
+            self.channels[name] = (value, timestamp)
+            if timestamp > self.updated:
+                self.updated = timestamp
+
+
+class LatestTable:
+    """Último valor por dispositivo y canal, con marcas de frescura."""
+
+    def __init__(self, stale_seconds: float = 60.0):
+        self.stale_seconds = stale_seconds
+        self.devices: Dict[str, DeviceLatest] = {}
+        self.loaded_at: Optional[float] = None
+
+    def update(self, rows: Iterable[FrameRow]) -> None:
+        for row in rows:
+            device = self.devices.get(row.device)
+            if device is None:
+                device = self.devices[row.device] = DeviceLatest()
+            for name, value in row.values.items():
+                if math.isfinite(value):  # un NaN no sustituye al último valor válido
+                    device.update(name, value, row.timestamp)
+
+    async def load(self) -> int:
+        """Precarga la tabla desde los rollups diarios más recientes."""
+        count = 0
+        async for device, name, value, timestamp in get_latest_values():
+            latest = self.devices.get(device)
+            if latest is None:
+                latest = self.devices[device] = DeviceLatest()
+            latest.update(name, value, timestamp.timestamp())
+            count += 1
+        self.loaded_at = time.time()
+        logger.info(f"Últimos valores precargados: {len(self.devices)} dispositivos, {count} canales")
+        return count
+
+    def __describe(self, name: str, latest: DeviceLatest, now: float) -> Dict[str, Any]:
+        channels = {}
+        for channel, (value, timestamp) in latest.channels.items():
+            channels[channel] = {
+                "value": value,
+                "t": _iso(timestamp),
+                "stale": now - timestamp > self.stale_seconds,
+            }
+        age = now - latest.updated
+        return {
+            "device": name,
+            "updated_at": _iso(latest.updated),
+            "age_seconds": round(age, 3),
+            "stale": age > self.stale_seconds,
+            "channels": channels,
+        }
+
+    def get(self, device: str) -> Optional[Dict[str, Any]]:
+        latest = self.devices.get(device)
+        if latest is None:
+            return None
+        return self.__describe(device, latest, time.time())
+
+    def all(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        return [self.__describe(name, latest, now) for name, latest in self.devices.items()]
+
+
+latest_table = LatestTable(settings.LATEST_STALE_SECONDS)
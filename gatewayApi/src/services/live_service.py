@@ -0,0 +1,192 @@
+"""
+Difusión en vivo de lecturas (Server-Sent Events).
+
+Los clientes se suscriben a dispositivos y canales. Los clientes con la misma
+suscripción de un dispositivo comparten grupo, y cada cambio se serializa una
+sola vez por grupo y se reparte a sus colas. Cada cola está acotada: si un
+cliente lento la llena se vacía y al siguiente envío recibe una foto con los
+valores actuales (se pierden los intermedios, no los últimos).
+"""
+import asyncio
+import json
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from src.core.config import settings
+from src.util.frame import FrameRow
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+# (dispositivo, canales); sin canales = todos
+GroupKey = Tuple[str, FrozenSet[str]]
+
+KEEPALIVE = b": ping\n\n"
+
+
+def _event(name: str, payload: dict) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+
+
+def _same(old: Optional[float], new: float) -> bool:
+    return old == new or (old != old and new != new)  # NaN == NaN
+
+
+def _clean(value: float) -> Optional[float]:
+    # NaN/inf no son JSON válido
+    return value if not isinstance(value, float) or math.isfinite(value) else None
+
+
+class LiveClient:
+    """Cola acotada de eventos ya serializados de un cliente."""
+
+    def __init__(self, groups: List[GroupKey], max_queue: int):
+        self.groups = groups
+        self.queue: Deque[bytes] = deque()
+        self.max_queue = max_queue
+        self.wakeup = asyncio.Event()
+        self.resync = True  # la primera entrega es siempre una foto
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, event: bytes) -> None:
+        if len(self.queue) >= self.max_queue:
+            # Cliente lento: descarta lo pendiente y pide una foto actualizada
+            self.dropped += len(self.queue)
+            self.queue.clear()
+            self.resync = True
+        self.queue.append(event)
+        self.wakeup.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
+
+
+@dataclass
+class LiveStats:
+    clients: int = 0
+    groups: int = 0
+    rows: int = 0
+    events: int = 0
+    deliveries: int = 0
+    dropped: int = 0
+    snapshots: int = 0
+
+
+@dataclass
+class _Group:
+    clients: Set[LiveClient] = field(default_factory=set)
+
+
+class LiveHub:
+    """Reparto compartido de cambios de lecturas a los clientes suscritos."""
+
+    def __init__(self, max_queue: int = 100, keepalive: float = 15.0):
+        self.max_queue = max_queue
+        self.keepalive = keepalive
+        self.groups: Dict[GroupKey, _Group] = {}
+        self.by_device: Dict[str, Set[GroupKey]] = {}
+        # Último valor y último instante conocidos por dispositivo
+        self.values: Dict[str, Dict[str, float]] = {}
+        self.timestamps: Dict[str, float] = {}
+        self.stats = LiveStats()
+
+    def subscribe(self, devices: Iterable[str], channels: Iterable[str]) -> LiveClient:
+        wanted = frozenset(channels)
+        keys = [(device, wanted) for device in dict.fromkeys(devices)]
+        client = LiveClient(keys, self.max_queue)
+        for key in keys:
+            self.groups.setdefault(key, _Group()).clients.add(client)
+            self.by_device.setdefault(key[0], set()).add(key)
+        self.stats.clients += 1
+        self.stats.groups = len(self.groups)
+        return client
+
+    def unsubscribe(self, client: LiveClient) -> None:
+        for key in client.groups:
+            group = self.groups.get(key)
+            if group is None:
+                continue
+            group.clients.discard(client)
+            if not group.clients:
+                del self.groups[key]
+                self.by_device[key[0]].discard(key)
+                if not self.by_device[key[0]]:
+                    del self.by_device[key[0]]
+        self.stats.clients -= 1
+        self.stats.dropped += client.dropped
+        self.stats.groups = len(self.groups)
+
+    def publish(self, rows: Iterable[FrameRow]) -> None:
+        """Calcula los cambios de cada fila y los reparte a los grupos afectados."""
+        for row in rows:
+            device = row.device
+            if row.timestamp < self.timestamps.get(device, float("-inf")):
+                continue  # datos atrasados: no cambian el valor en vivo
+            self.timestamps[device] = row.timestamp
+            last = self.values.setdefault(device, {})
+            changed = {name: value for name, value in row.values.items() if name not in last or not _same(last[name], value)}
+            if not changed:
+                continue
+            last.update(changed)
+            self.stats.rows += 1
+            for key in self.by_device.get(device, ()):
+                wanted = key[1]
+                values = changed if not wanted else {name: changed[name] for name in wanted.intersection(changed)}
+                if not values:
+                    continue
+                event = _event("readings", {"device": device, "t": row.timestamp, "values": {k: _clean(v) for k, v in values.items()}})
+                self.stats.events += 1
+                for client in self.groups[key].clients:
+                    client.push(event)
+                    self.stats.deliveries += 1
+
+    def snapshot(self, client: LiveClient) -> List[bytes]:
+        """Valores actuales de las suscripciones del cliente."""
+        events = []
+        for device, wanted in client.groups:
+            last = self.values.get(device)
+            if not last:
+                continue
+            values = last if not wanted else {name: last[name] for name in wanted.intersection(last)}
+            events.append(_event("snapshot", {
+                "device": device,
+                "t": self.timestamps.get(device),
+                "values": {k: _clean(v) for k, v in values.items()},
+            }))
+        return events
+
+    async def stream(self, client: LiveClient) -> AsyncIterator[bytes]:
+        """Eventos SSE de un cliente hasta que se desconecte o se cierre el hub."""
+        try:
+            while not client.closed:
+                if client.resync:
+                    client.resync = False
+                    client.queue.clear()
+                    self.stats.snapshots += 1
+                    for event in self.snapshot(client):
+                        yield event
+                while client.queue and not client.resync:
+                    yield client.queue.popleft()
+                if client.resync or client.queue:
+                    continue
+                client.wakeup.clear()
+                try:
+                    await asyncio.wait_for(client.wakeup.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+        finally:
+            self.unsubscribe(client)
+
+    def close(self) -> None:
+        for group in list(self.groups.values()):
+            for client in list(group.clients):
+                client.close()
+
+    def as_dict(self) -> dict:
+        return {**self.stats.__dict__, "devices": len(self.values)}
+
+
+live_hub = LiveHub(settings.LIVE_QUEUE_SIZE, settings.LIVE_KEEPALIVE_SECONDS)
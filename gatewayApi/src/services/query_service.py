@@ -0,0 +1,135 @@
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.core.config import settings
+from src.models.model import Aggregation
+from src.repositories.query_repository import stream_readings
+from src.repositories.rollup_repository import RAW_RESOLUTION, RESOLUTIONS, choose_resolution
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+AUTO_RESOLUTION = "auto"
+
+
+@dataclass
+class QueryPlan:
+    """Consulta validada: colección de origen y tamaño de los buckets de salida."""
+    device: str
+    channels: List[str]
+    start: datetime
+    end: datetime
+    resolution: str
+    interval: Optional[int]
+    aggs: List[Aggregation]
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _parse_channels(channels: List[str]) -> List[str]:
+    # Admite canales repetidos (?channels=A&channels=B) o separados por comas
+    names = list(dict.fromkeys(name.strip() for item in channels for name in item.split(",") if name.strip()))
+    if not names:
+        raise ValueError("Debe indicarse al menos un canal")
+    if len(names) > settings.QUERY_MAX_CHANNELS:
+        raise ValueError(f"Demasiados canales (máximo {settings.QUERY_MAX_CHANNELS})")
+    invalid = [name for name in names if "." in name or name.startswith("$")]
+    if invalid:
+        raise ValueError(f"Nombres de canal inválidos: {invalid}")
+    return names
+
+
+def _round_up(value: float, multiple: int) -> int:
+    return max(multiple, math.ceil(value / multiple) * multiple)
+
+
+def plan_query(device: str, channels: List[str], start: datetime, end: datetime, resolution: str = AUTO_RESOLUTION,
+               interval: int | None = None, aggs: List[Aggregation] | None = None,
+               max_points: int | None = None) -> QueryPlan:
+    """
+    Valida una consulta y elige su origen.
+
+    Con resolution="auto" el origen lo elige choose_resolution: sin
+    `interval` se devuelven los buckets de la resolución más fina que da como
+    mucho `max_points` puntos. Un `interval` explícito se rechaza si da más
+    de `max_points` puntos (el mismo tope que choose_resolution). La energía
+    solo existe en los rollups, así que nunca se consulta sobre datos crudos y
+    su intervalo debe ser múltiplo del rollup más fino.
+
+    :raises ValueError: Si la consulta no es válida.
+    """
+    start, end = _as_utc(start), _as_utc(end)
+    if start >= end:
+        raise ValueError("El inicio debe ser anterior al fin")
+    if interval is not None and interval < 1:
+        raise ValueError("El intervalo debe ser de al menos 1 segundo")
+    aggs = list(dict.fromkeys(aggs or [Aggregation.AVG]))
+    max_points = max_points or settings.ROLLUP_MAX_POINTS
+    minimum = next(iter(RESOLUTIONS)) if Aggregation.ENERGY in aggs else RAW_RESOLUTION
+    if interval is not None:
+        if minimum != RAW_RESOLUTION and interval % RESOLUTIONS[minimum][0]:
+            raise ValueError(f"El agregado 'energy' requiere un intervalo múltiplo de {RESOLUTIONS[minimum][0]} s")
+        span = (end - start).total_seconds()
+        if span / interval > max_points:
+            raise ValueError(f"El intervalo da más de {max_points} puntos: debe ser de al menos {math.ceil(span / max_points)} s")
+
+    if resolution == AUTO_RESOLUTION:
+        step = interval or math.ceil((end - start).total_seconds() / max_points)
+        resolution = choose_resolution(start, end, max_points, step=interval)
+        if resolution == RAW_RESOLUTION:
+            resolution = minimum
+        # Con un rollup que ya cabe en max_points el paso es su propio bucket
+        interval = step if resolution == RAW_RESOLUTION else _round_up(step, RESOLUTIONS[resolution][0])
+    elif resolution != RAW_RESOLUTION and resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolución desconocida: {resolution}")
+    elif resolution == RAW_RESOLUTION and minimum != RAW_RESOLUTION:
+        raise ValueError("El agregado 'energy' requiere una resolución de rollup")
+    elif resolution != RAW_RESOLUTION and interval is not None and interval % RESOLUTIONS[resolution][0]:
+        raise ValueError(f"El intervalo debe ser múltiplo de la resolución {resolution}")
+
+    return QueryPlan(device, _parse_channels(channels), start, end, resolution, interval, aggs)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return _as_utc(value).isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+async def _ndjson(first: Optional[Dict[str, Any]], documents: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Serializa los puntos como NDJSON en trozos de hasta QUERY_CHUNK_BYTES."""
+    if first is None:
+        return
+    chunk = [json.dumps(first, default=_default, separators=(",", ":"))]
+    size = len(chunk[0])
+    try:
+        async for document in documents:
+            line = json.dumps(document, default=_default, separators=(",", ":"))
+            chunk.append(line)
+            size += len(line) + 1
+            if size >= settings.QUERY_CHUNK_BYTES:
+                yield ("\n".join(chunk) + "\n").encode()
+                chunk, size = [], 0
+    except Exception as e:
+        # La respuesta ya empezó: solo queda cortarla
+        logger.error(f"Error leyendo el cursor de la consulta: {e}")
+        raise
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode()
+
+
+async def query_readings(plan: QueryPlan) -> AsyncIterator[bytes]:
+    """
+    Lanza la consulta y devuelve el flujo NDJSON. El primer documento se lee
+    aquí para que los errores de la base de datos lleguen antes de empezar a
+    responder.
+    """
+    documents = stream_readings(plan.device, plan.channels, plan.start, plan.end,
+                                plan.resolution, plan.interval, plan.aggs)
+    first = await anext(documents, None)
+    logger.debug(f"Consulta {plan.device} {plan.channels} desde {plan.resolution} cada {plan.interval}s")
+    return _ndjson(first, documents)
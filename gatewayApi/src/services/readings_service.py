@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from src.core.config import settings
+from src.models.model import ReadingsIngestResponse
+from src.repositories.readings_repository import insert_reading_buckets, upsert_readings
+from src.repositories.rollup_repository import merge_rollups, recompute_rollups
+from src.services.latest_service import latest_table
+from src.services.live_service import live_hub
+from src.util.energy import EnergyIntegrator, GapPolicy
+from src.util.frame import FrameRow, decode
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Estado de integración de energía de este proceso (última muestra por canal)
+energy_integrator = EnergyIntegrator(
+    settings.ENERGY_POWER_CHANNELS,
+    to_kw=settings.ENERGY_POWER_TO_KW,
+    max_gap=settings.ENERGY_MAX_GAP_SECONDS,
+    policy=GapPolicy(settings.ENERGY_GAP_POLICY),
+    interval=settings.READINGS_BUCKET_SECONDS,
+)
+
+
+def decode_readings(payload: bytes) -> List[FrameRow]:
+    """
+    Decodifica un lote enviado por el gateway (trama binaria o su equivalente JSON).
+
+    :raises ValueError: Si el payload no es una trama válida.
+    """
+    try:
+        return decode(payload)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Trama de lecturas inválida: {e}") from e
+
+
+async def update_rollups(rows: List[FrameRow], backfill: bool = False) -> None:
+    """
+    Actualiza los rollups tras guardar las lecturas crudas.
+
+    Las filas posteriores a lo ya integrado de su dispositivo se funden de
+    forma incremental junto con su energía. Las tardías (anteriores a eso), las
+    de backfill y las de un dispositivo sin estado en este proceso (p. ej. tras
+    un reinicio) recalculan desde los datos crudos solo los buckets de su
+    intervalo: no se duplican muestras ya agregadas y el tramo desde la última
+    muestra guardada entra en la energía, lo que además siembra el estado.
+    """
+    recent: List[FrameRow] = []
+    late: Dict[str, Tuple[float, float]] = defaultdict(lambda: (float("inf"), float("-inf")))
+    for row in rows:
+        if backfill or row.timestamp <= energy_integrator.seen.get(row.device, float("inf")):
+            first, last = late[row.device]
+            late[row.device] = (min(first, row.timestamp), max(last, row.timestamp))
+        else:
+            recent.append(row)
+
+    if recent:
+        await merge_rollups(recent, energy_integrator.integrate(recent))
+    for device, (first, last) in late.items():
+        await recompute_rollups(
+            device,
+            datetime.fromtimestamp(first, tz=timezone.utc),
+            datetime.fromtimestamp(last, tz=timezone.utc),
+            energy_integrator,
+        )
+        # Aunque el dispositivo no tenga canales de potencia, su próximo lote ya es incremental
+        energy_integrator.touch(device, last)
+
+
+async def ingest_readings(payload: bytes, group: str | None = None, backfill: bool = False) -> ReadingsIngestResponse:
+    """
+    Guarda un lote de lecturas en la colección de buckets.
+
+    Con `backfill` los buckets se insertan completos con insert_many (cargas
+    históricas) y los que ya existen se completan con upserts; si no, se
+    añaden a los buckets existentes con upserts.
+    """
+    rows = decode_readings(payload)
+    if backfill:
+        buckets, stored = await insert_reading_buckets(rows, group)
+    else:
+        buckets, stored = await upsert_readings(rows, group)
+        live_hub.publish(rows)
+    latest_table.update(rows)
+    try:
+        await update_rollups(rows, backfill)
+    except Exception as e:
+        # Los datos crudos ya están guardados; un reenvío del lote los duplicaría
+        logger.error(f"Error actualizando rollups: {e}")
+    samples = sum(len(row.values) for row in rows)
+    if stored < len(rows):
+        logger.warning(f"Ingesta: solo se guardaron {stored} de {len(rows)} filas")
+    logger.debug(f"Ingesta: {len(rows)} filas, {samples} muestras, {buckets} buckets")
+    return ReadingsIngestResponse(rows=len(rows), stored=stored, samples=samples, buckets=buckets)
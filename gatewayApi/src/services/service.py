@@ -2,8 +2,9 @@ from typing import Dict, Optional
 from datetime import timedelta
 from src.models.model import CollectionNames, UserLoginResponse, User, KeysNames
 from src.repositories.repository import get_document_by_dict, insert_data
+from src.services.user_service import invalidate_user
 from src.util.logging import get_logger
-from src.auth.security import hash_password, verify_password, create_access_token, create_refresh_token
+from src.auth.security import PasswordPoolBusy, hash_password_async, verify_password_async, create_access_token, create_refresh_token
 from src.core.config import settings
 
 logger = get_logger(__name__)
@@ -19,9 +20,10 @@ async def create_user(user_data: Dict) -> User | None:
         
         # Hash de la contraseña antes de guardar
         if KeysNames.PASSWORD in user_data:
-            user_data[KeysNames.PASSWORD] = hash_password(user_data[KeysNames.PASSWORD])
+            user_data[KeysNames.PASSWORD] = await hash_password_async(user_data[KeysNames.PASSWORD])
 
         result_id = await insert_data(collection=CollectionNames.USERS.value, data=user_data)
+        invalidate_user(user_data[KeysNames.USERNAME])
         if result_id:
             user_data["_id"] = str(result_id)
             # Remover la contraseña del objeto retornado
@@ -29,6 +31,8 @@ async def create_user(user_data: Dict) -> User | None:
             logger.info(f"Usuario {user_data.get(KeysNames.USERNAME, 'N/A')} creado con ID: {result_id}")
             return User(**user_data)
         
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         logger.error(f"Error al crear el usuario: {e}")
     return None
@@ -48,7 +52,7 @@ async def authenticate_user(credentials: Dict) -> UserLoginResponse | None:
             return None
         
         # Verificar contraseña
-        if not verify_password(credentials[KeysNames.PASSWORD], user_indb[KeysNames.PASSWORD]):
+        if not await verify_password_async(credentials[KeysNames.PASSWORD], user_indb[KeysNames.PASSWORD]):
             logger.warning(f"Contraseña incorrecta para usuario: {credentials[KeysNames.USERNAME]}")
             return None
         
@@ -96,6 +100,8 @@ async def authenticate_user(credentials: Dict) -> UserLoginResponse | None:
         
         return login_response
         
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         logger.error(f"Error al autenticar al usuario: {e}")
     return None
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Dict
+from src.core.config import settings
+from src.models.model import CollectionNames, KeysNames, User
+from src.repositories.repository import get_document_by_dict, update_data
+from src.auth.security import hash_password_async
+from src.util.cache import TTLCache
+from src.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Usuarios autenticados por nombre de usuario (sin contraseña)
+user_cache: TTLCache[User] = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def _to_user(document: Dict[str, Any]) -> User:
+    data = dict(document)
+    data["_id"] = str(data["_id"])
+    data.pop(KeysNames.PASSWORD, None)
+    return User(**data)
+
+
+async def get_user(username: str) -> User | None:
+    """
+    Usuario por nombre de usuario, desde la caché si está vigente. Los
+    usuarios inexistentes no se cachean.
+    """
+    user = user_cache.get(username)
+    if user is not None:
+        return user.model_copy()
+    document = await get_document_by_dict({KeysNames.USERNAME: username}, CollectionNames.USERS.value)
+    if document is None:
+        return None
+    user = _to_user(document)
+    user_cache.set(username, user)
+    return user.model_copy()
+
+
+def invalidate_user(username: str) -> None:
+    """Descarta el usuario cacheado; llamar tras cualquier cambio del usuario."""
+    if user_cache.invalidate(username):
+        logger.debug(f"Usuario {username} retirado de la caché")
+
+
+async def update_user(username: str, changes: Dict[str, Any]) -> bool:
+    """Actualiza campos de un usuario (la contraseña se guarda hasheada) e invalida su caché."""
+    changes = dict(changes)
+    changes.pop("_id", None)
+    if KeysNames.PASSWORD in changes:
+        changes[KeysNames.PASSWORD] = await hash_password_async(changes[KeysNames.PASSWORD])
+    changes[KeysNames.UPDATED_AT] = datetime.utcnow()
+    try:
+        updated = await update_data({KeysNames.USERNAME: username}, changes, CollectionNames.USERS.value)
+    finally:
+        invalidate_user(username)
+        new_username = changes.get(KeysNames.USERNAME)
+        if new_username:
+            invalidate_user(new_username)
+    return updated
+
+
+def get_user_cache_stats() -> Dict[str, Any]:
+    return user_cache.as_dict()
@@ -0,0 +1,103 @@
+"""
+Caché en memoria acotada, con caducidad por entrada y expulsión LRU.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evicted: int = 0
+    invalidated: int = 0
+
+
+class TTLCache(Generic[V]):
+    """
+    Diccionario acotado a `max_size` entradas que caducan a los `ttl`
+    segundos (o en el instante indicado al guardarlas). Al llenarse expulsa
+    la entrada usada hace más tiempo; con `evict=False` nunca retira una
+    entrada vigente y rechaza las nuevas mientras esté llena. No es seguro
+    entre hilos: está pensado para usarse desde el bucle de eventos.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic, evict: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.evict = evict
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self.stats = CacheStats()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            self.stats.misses += 1
+            return None
+        expires, value = item
+        if self.clock() >= expires:
+            del self._data[key]
+            self.stats.expired += 1
+            self.stats.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, expires: Optional[float] = None) -> bool:
+        """
+        Guarda `value`; `expires` (en el reloj de la caché) acota la caducidad
+        por defecto. Devuelve False si la caché está llena y no expulsa.
+        """
+        now = self.clock()
+        deadline = now + self.ttl
+        if expires is not None:
+            deadline = min(deadline, expires)
+        if not self.evict and key not in self._data and len(self._data) >= self.max_size:
+            self.purge(now)
+            if len(self._data) >= self.max_size:
+                return False
+        self._data[key] = (deadline, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.stats.evicted += 1
+        return True
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Retira las entradas caducadas y devuelve cuántas."""
+        now = self.clock() if now is None else now
+        expired = [key for key, (deadline, _) in self._data.items() if now >= deadline]
+        for key in expired:
+            del self._data[key]
+        self.stats.expired += len(expired)
+        return len(expired)
+
+    def invalidate(self, key: Hashable) -> bool:
+        if self._data.pop(key, None) is None:
+            return False
+        self.stats.invalidated += 1
+        return True
+
+    def clear(self) -> None:
+        self.stats.invalidated += len(self._data)
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            **self.stats.__dict__,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else None,
+        }
@@ -2,6 +2,12 @@ import asyncio
 import time
 from src.core.config import settings
 from src.core.watchdog import BaseWatchdog
+from src.core.scheduler import PollScheduler
+from src.config.config import configManager
+from src.core.ringbuffer import RingBufferStore
+from src.modbus.conect import get_modbus_clients, get_modbus_pool
+from src.mqtt.publisher import MqttPublisher
+from src.pipeline.cycle import PollPipeline
 
 class PrintTaskWatchdog(BaseWatchdog):
     connect = "ModbusConnect" 
@@ -12,6 +18,12 @@ class PrintTaskWatchdog(BaseWatchdog):
         # Parámetros internos
         self.is_connected = False
         self.read_task = None
+        self.scheduler = None
+        self.clients = {}
+        self.publisher = None
+        # Últimas muestras de cada canal, con memoria acotada por [RING_BUFFER]
+        self.ring_buffer = RingBufferStore.from_config()
+        self.read_interval = float(configManager.get_value("MAIN_MODBUS", "interval", fallback=1))
     
     async def main_loop(self, connect_value: bool = False, readstart_value: bool = False):
         print(f"🔄 main_loop ejecutado - Connect: {connect_value}, ReadStart: {readstart_value}")
@@ -47,28 +59,39 @@ class PrintTaskWatchdog(BaseWatchdog):
                 self.read_task = None
 
     async def task_connect(self):
+        self.clients = await get_modbus_clients()
+        if not self.clients:
+            print("❌ No se pudo configurar ningún cliente Modbus.")
+            return
+        self.publisher = MqttPublisher.from_config()
+        await self.publisher.start()
         self.is_connected = True
         print("🔌 Conectado a Modbus.")
         
     async def task_Read(self):
         print("📖 Iniciando lectura de Modbus...")
+        # Plazos absolutos: el periodo no deriva con la duración de cada ciclo
+        # Un trabajo por intervalo declarado en los mapas (por defecto el de [MAIN_MODBUS])
+        self.scheduler = PollScheduler()
+        pipeline = PollPipeline(get_modbus_pool(), self.clients, self.read_interval, self.publisher, self.ring_buffer)
+        pipeline.register(self.scheduler)
         try:
-            count = 0
-            while True:
-                # connect_val, readstart_val = self._get_current_json_values()
-                # if not connect_val or not readstart_val:
-                #     print("🛑 Variables cambiaron, deteniendo lectura...")
-                #     break
-                count += 1
-                print(f"🖨️ Print #{count} - {time.strftime('%H:%M:%S')} - Leyendo datos Modbus...")
-                await asyncio.sleep(1)
+            await self.scheduler.run()
         except asyncio.CancelledError:
             print("❌ Tarea de lectura cancelada.")
+            print(f"📊 Estadísticas de lectura: {self.scheduler.get_stats()}")
             raise
-            
+
     async def task_disconnect(self):
         print("🔌 Desconectando de Modbus...")
         await self._stop_read_task()
+        if self.publisher is not None:
+            await self.publisher.stop()
+            self.publisher = None
+        pool = get_modbus_pool()
+        if pool is not None:
+            await pool.close_all()
+        self.clients = {}
         print("❌ Desconectado de Modbus.")
 
 def main():
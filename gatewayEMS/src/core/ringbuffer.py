@@ -0,0 +1,171 @@
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from src.config.config import configManager
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Calidad de una muestra (flag de 1 byte)
+QUALITY_GOOD = 0
+QUALITY_BAD = 1
+QUALITY_STALE = 2
+
+# Bytes por muestra: timestamp (d) + valor (d) + calidad (B)
+SAMPLE_BYTES = array("d").itemsize * 2 + array("B").itemsize
+
+
+@dataclass
+class ChannelRingBuffer:
+    """
+    Búfer circular preasignado para las últimas muestras de un canal.
+
+    Timestamps (time.monotonic), valores y flags de calidad viven en tres
+    `array` de tamaño fijo; append es O(1) y nunca reserva memoria.
+    """
+    capacity: int
+    timestamps: array = field(init=False, repr=False)
+    values: array = field(init=False, repr=False)
+    quality: array = field(init=False, repr=False)
+    _head: int = field(init=False, default=0, repr=False)
+    _size: int = field(init=False, default=0, repr=False)
+
+    def __post_init__(self):
+        if self.capacity <= 0:
+            raise ValueError(f"Capacidad inválida: {self.capacity}")
+        self.timestamps = array("d", bytes(8 * self.capacity))
+        self.values = array("d", bytes(8 * self.capacity))
+        self.quality = array("B", bytes(self.capacity))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float, timestamp: Optional[float] = None, quality: int = QUALITY_GOOD) -> None:
+        """Añade una muestra, sobrescribiendo la más antigua si el búfer está lleno."""
+        head = self._head
+        self.timestamps[head] = time.monotonic() if timestamp is None else timestamp
+        self.values[head] = value
+        self.quality[head] = quality
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def last(self) -> Optional[Tuple[float, float, int]]:
+        """Última muestra (timestamp, valor, calidad) o None si está vacío."""
+        if not self._size:
+            return None
+        i = (self._head - 1) % self.capacity
+        return self.timestamps[i], self.values[i], self.quality[i]
+
+    def window(self, seconds: Optional[float] = None, now: Optional[float] = None) -> List[Tuple[memoryview, memoryview, memoryview]]:
+        """
+        Vistas sin copia de las muestras de los últimos `seconds` segundos (todas si es None).
+
+        Devuelve uno o dos tramos (timestamps, values, quality) en orden
+        cronológico: dos cuando la ventana cruza el final del array circular.
+        Las vistas dejan de ser válidas en cuanto se añaden nuevas muestras.
+        """
+        if not self._size:
+            return []
+        start = (self._head - self._size) % self.capacity
+        count = self._size
+        if seconds is not None:
+            cutoff = (time.monotonic() if now is None else now) - seconds
+            skip = self.__first_index_after(start, count, cutoff)
+            start = (start + skip) % self.capacity
+            count -= skip
+            if count <= 0:
+                return []
+
+        ts, vs, qs = memoryview(self.timestamps), memoryview(self.values), memoryview(self.quality)
+        end = start + count
+        if end <= self.capacity:
+            return [(ts[start:end], vs[start:end], qs[start:end])]
+        wrap = end - self.capacity
+        return [
+            (ts[start:], vs[start:], qs[start:]),
+            (ts[:wrap], vs[:wrap], qs[:wrap]),
+        ]
+
+    def __first_index_after(self, start: int, count: int, cutoff: float) -> int:
+        """Búsqueda binaria del primer índice lógico con timestamp >= cutoff."""
+        lo, hi = 0, count
+        capacity = self.capacity
+        timestamps = self.timestamps
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if timestamps[(start + mid) % capacity] < cutoff:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+@dataclass
+class RingBufferStore:
+    """
+    Registro de búferes por canal con un presupuesto de memoria fijo.
+
+    La capacidad de cada canal es la menor entre la retención configurada y la
+    parte del presupuesto que le corresponde a cada uno de `max_channels`
+    canales, de modo que la memoria total nunca supera `memory_budget_bytes`.
+    """
+    retention_seconds: float = 600.0
+    sample_interval: float = 1.0
+    memory_budget_bytes: int = 32 * 1024 * 1024
+    max_channels: int = 2048
+    channels: Dict[str, ChannelRingBuffer] = field(init=False, default_factory=dict)
+    capacity: int = field(init=False)
+
+    def __post_init__(self):
+        by_retention = int(self.retention_seconds / self.sample_interval) + 1
+        by_budget = self.memory_budget_bytes // (SAMPLE_BYTES * max(self.max_channels, 1))
+        self.capacity = max(1, min(by_retention, by_budget))
+        if by_budget < by_retention:
+            logger.warning(
+                f"Presupuesto de memoria insuficiente para {self.retention_seconds}s de retención: "
+                f"se guardan {self.capacity} muestras por canal"
+            )
+
+    @classmethod
+    def from_config(cls) -> "RingBufferStore":
+        """Crea el almacén con la sección [RING_BUFFER] de config.ini."""
+        section = "RING_BUFFER"
+        config = configManager.config
+        return cls(
+            retention_seconds=config.getfloat(section, "retention_seconds", fallback=600.0),
+            sample_interval=config.getfloat(section, "sample_interval", fallback=1.0),
+            memory_budget_bytes=config.getint(section, "memory_budget_bytes", fallback=32 * 1024 * 1024),
+            max_channels=config.getint(section, "max_channels", fallback=2048),
+        )
+
+    def channel(self, name: str) -> Optional[ChannelRingBuffer]:
+        """Devuelve (creando si hace falta) el búfer del canal; None si se alcanzó max_channels."""
+        buffer = self.channels.get(name)
+        if buffer is None:
+            if len(self.channels) >= self.max_channels:
+                logger.error(f"Límite de {self.max_channels} canales alcanzado, se descarta {name}")
+                return None
+            buffer = self.channels[name] = ChannelRingBuffer(self.capacity)
+        return buffer
+
+    def append(self, name: str, value: float, timestamp: Optional[float] = None, quality: int = QUALITY_GOOD) -> None:
+        buffer = self.channel(name)
+        if buffer is not None:
+            buffer.append(value, timestamp, quality)
+
+    def append_many(self, values: Dict[str, float], timestamp: Optional[float] = None, quality: int = QUALITY_GOOD, prefix: str = "") -> None:
+        """
+        Añade un ciclo decodificado ({canal: valor}) con un mismo timestamp. Los
+        canales se guardan como `prefix + canal` y los NaN (registros sin leer)
+        con calidad QUALITY_BAD.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        for name, value in values.items():
+            self.append(prefix + name, value, timestamp, QUALITY_BAD if value != value else quality)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Memoria reservada actualmente por los búferes."""
+        return len(self.channels) * self.capacity * SAMPLE_BYTES
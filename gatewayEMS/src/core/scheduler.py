@@ -0,0 +1,161 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PollStats:
+    """Estadísticas de puntualidad de un trabajo periódico (segundos)."""
+    cycles: int = 0
+    overruns: int = 0
+    skipped: int = 0
+    errors: int = 0
+    last_lateness: float = 0.0
+    max_lateness: float = 0.0
+    total_lateness: float = 0.0
+    max_jitter: float = 0.0
+    total_jitter: float = 0.0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+
+    def record(self, lateness: float, duration: float) -> None:
+        if self.cycles:
+            jitter = abs(lateness - self.last_lateness)
+            self.total_jitter += jitter
+            self.max_jitter = max(self.max_jitter, jitter)
+        self.cycles += 1
+        self.last_lateness = lateness
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+
+    def as_dict(self) -> Dict[str, Any]:
+        cycles = max(self.cycles, 1)
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "mean_lateness": round(self.total_lateness / cycles, 6),
+            "max_lateness": round(self.max_lateness, 6),
+            "mean_jitter": round(self.total_jitter / max(self.cycles - 1, 1), 6),
+            "max_jitter": round(self.max_jitter, 6),
+            "last_duration": round(self.last_duration, 6),
+            "max_duration": round(self.max_duration, 6),
+        }
+
+
+@dataclass
+class PollJob:
+    """Trabajo periódico: un dispositivo o un grupo de registros con su propio intervalo."""
+    name: str
+    interval: float
+    callback: Callable[[], Awaitable[Any]]
+    offset: float = 0.0
+    stats: PollStats = field(default_factory=PollStats)
+
+
+@dataclass
+class PollScheduler:
+    """
+    Planificador multi-frecuencia basado en plazos absolutos (time.monotonic).
+
+    Cada trabajo corre en su propia tarea y su siguiente plazo se calcula sumando
+    el intervalo al plazo anterior, no al instante en que terminó, por lo que el
+    periodo no deriva. Si un ciclo dura más que el intervalo se registra un
+    overrun y se saltan los plazos ya vencidos en lugar de estirar el ciclo.
+    """
+    jobs: Dict[str, PollJob] = field(default_factory=dict)
+    _tasks: List[asyncio.Task] = field(init=False, default_factory=list, repr=False)
+
+    def add_job(self, name: str, interval: float, callback: Callable[[], Awaitable[Any]], offset: float = 0.0) -> PollJob:
+        """
+        Registra un trabajo periódico.
+
+        :param interval: Periodo en segundos (p. ej. 0.25 para potencia, 60 para energía).
+        :param offset: Desfase inicial para repartir trabajos del mismo intervalo.
+        """
+        if interval <= 0:
+            raise ValueError(f"Intervalo inválido para {name}: {interval}")
+        if name in self.jobs:
+            raise ValueError(f"El trabajo {name} ya está registrado")
+        job = PollJob(name=name, interval=float(interval), callback=callback, offset=float(offset))
+        self.jobs[name] = job
+        return job
+
+    async def run(self) -> None:
+        """Ejecuta todos los trabajos hasta que se cancele la tarea."""
+        start = time.monotonic()
+        self._tasks = [
+            asyncio.create_task(self._run_job(job, start), name=f"poll-{job.name}")
+            for job in self.jobs.values()
+        ]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Cancela las tareas de todos los trabajos."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: job.stats.as_dict() for name, job in self.jobs.items()}
+
+    async def _run_job(self, job: PollJob, start: float) -> None:
+        deadline = start + job.offset
+        while True:
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            began = time.monotonic()
+            try:
+                await job.callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.stats.errors += 1
+                logger.error(f"Error en el trabajo {job.name}: {e}")
+            finished = time.monotonic()
+            job.stats.record(lateness=began - deadline, duration=finished - began)
+
+            deadline += job.interval
+            if finished > deadline:
+                missed = int((finished - deadline) // job.interval) + 1
+                job.stats.overruns += 1
+                job.stats.skipped += missed
+                deadline += missed * job.interval
+                logger.warning(
+                    f"Overrun en {job.name}: ciclo de {finished - began:.3f}s para un intervalo de "
+                    f"{job.interval:.3f}s, {missed} plazo(s) saltado(s)"
+                )
+
+
+def group_by_interval(device_map: Dict[str, Any], default_interval: float) -> Dict[float, Dict[str, Dict[str, Any]]]:
+    """
+    Separa un mapa de registros por intervalo de sondeo (segundos), para crear
+    un trabajo por intervalo. Cada entrada puede fijar `interval`; si no, usa
+    la clave `interval` del propio mapa o, en su defecto, `default_interval`.
+    Las claves del mapa que no son entradas de registro se ignoran.
+    """
+    fallback = device_map.get("interval")
+    default = float(fallback) if fallback is not None and not isinstance(fallback, dict) else float(default_interval)
+    groups: Dict[float, Dict[str, Dict[str, Any]]] = {}
+    for name, entry in device_map.items():
+        if not isinstance(entry, dict):
+            continue
+        groups.setdefault(float(entry.get("interval", default)), {})[name] = entry
+    return groups
@@ -0,0 +1,151 @@
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Optional
+from src.config.config import configManager
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BreakerState(str, Enum):
+    """Estados del circuit breaker de un esclavo"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
+@dataclass
+class AdaptiveTimeout:
+    """
+    Timeout por esclavo calculado a partir de sus tiempos de respuesta
+    (estimador SRTT/RTTVAR de RFC 6298), acotado entre `min_timeout` y `max_timeout`.
+    """
+    max_timeout: float
+    min_timeout: float = 0.05
+    srtt: Optional[float] = None
+    rttvar: float = 0.0
+
+    @property
+    def current(self) -> float:
+        if self.srtt is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+    def observe(self, rtt: float) -> None:
+        """Solo se alimenta con respuestas válidas: los timeouts no son muestras de RTT."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+
+@dataclass
+class SlaveCircuitBreaker:
+    """
+    Circuit breaker de un esclavo Modbus.
+
+    Tras `failure_threshold` fallos seguidos se abre y el esclavo deja de
+    consultarse; pasado el intervalo de prueba se permite un ciclo de prueba
+    (half-open). Si la prueba falla, el intervalo se duplica hasta `max_probe_interval`.
+    """
+    name: str
+    failure_threshold: int
+    timeout: AdaptiveTimeout
+    base_probe_interval: float = 1.0
+    max_probe_interval: float = 300.0
+    state: BreakerState = BreakerState.CLOSED
+    consecutive_failures: int = 0
+    trips: int = 0
+    skipped: int = 0
+    probe_interval: float = 0.0
+    next_probe_at: float = 0.0
+
+    def allow(self) -> bool:
+        """Indica si el esclavo debe consultarse en este ciclo."""
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.OPEN and time.monotonic() >= self.next_probe_at:
+            self.state = BreakerState.HALF_OPEN
+            logger.info(f"Circuit breaker {self.name}: probando esclavo tras {self.probe_interval:.1f}s")
+            return True
+        if self.state == BreakerState.HALF_OPEN:
+            return True
+        self.skipped += 1
+        return False
+
+    def record_success(self, rtt: float) -> None:
+        self.timeout.observe(rtt)
+        self.consecutive_failures = 0
+        if self.state != BreakerState.CLOSED:
+            logger.info(f"Circuit breaker {self.name}: esclavo recuperado, cerrado")
+            self.state = BreakerState.CLOSED
+            self.probe_interval = 0.0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == BreakerState.HALF_OPEN:
+            self.__open(min(self.max_probe_interval, max(self.base_probe_interval, self.probe_interval * 2)))
+        elif self.state == BreakerState.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self.__open(self.base_probe_interval)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "state": str(self.state),
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "skipped": self.skipped,
+            "probe_interval": round(self.probe_interval, 3),
+            "timeout": round(self.timeout.current, 4),
+            "srtt": round(self.timeout.srtt, 4) if self.timeout.srtt is not None else None,
+        }
+
+    def __open(self, probe_interval: float) -> None:
+        self.state = BreakerState.OPEN
+        self.trips += 1
+        self.probe_interval = probe_interval
+        self.next_probe_at = time.monotonic() + probe_interval
+        logger.warning(
+            f"Circuit breaker {self.name}: abierto tras {self.consecutive_failures} fallos, "
+            f"siguiente prueba en {probe_interval:.1f}s"
+        )
+
+
+@dataclass
+class BreakerRegistry:
+    """Circuit breakers de los esclavos de un puerto serie o host."""
+    name: str
+    failure_threshold: int = 3
+    task_timeout: float = 5.0
+    min_timeout: float = 0.05
+    max_probe_interval: float = 300.0
+    breakers: Dict[int, SlaveCircuitBreaker] = field(init=False, default_factory=dict)
+
+    @classmethod
+    def from_config(cls, name: str) -> "BreakerRegistry":
+        """Usa `task_timeout` y `retry_on_failure` de la sección [MAIN_MODBUS]."""
+        config = configManager.config
+        return cls(
+            name=name,
+            failure_threshold=max(1, config.getint("MAIN_MODBUS", "retry_on_failure", fallback=3)),
+            task_timeout=config.getfloat("MAIN_MODBUS", "task_timeout", fallback=5.0),
+        )
+
+    def get(self, slave: int) -> SlaveCircuitBreaker:
+        breaker = self.breakers.get(slave)
+        if breaker is None:
+            breaker = self.breakers[slave] = SlaveCircuitBreaker(
+                name=f"{self.name}/{slave}",
+                failure_threshold=self.failure_threshold,
+                timeout=AdaptiveTimeout(max_timeout=self.task_timeout, min_timeout=self.min_timeout),
+                max_probe_interval=self.max_probe_interval,
+            )
+        return breaker
+
+    def snapshot(self) -> Dict[int, Dict[str, Any]]:
+        return {slave: breaker.as_dict() for slave, breaker in self.breakers.items()}
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Por encima de 19200 baudios la especificación Modbus RTU fija t3.5 en 1.75 ms
+FIXED_GAP_BAUDRATE = 19200
+FIXED_GAP_SECONDS = 0.00175
+
+
+def character_bits(databits: int = 8, parity: Optional[str] = "N", stopbits: int = 1) -> int:
+    """Bits por carácter en la línea: start + datos + paridad + stop."""
+    has_parity = str(parity or "N").strip().upper()[:1] in ("E", "O", "M", "S")
+    return 1 + int(databits) + (1 if has_parity else 0) + int(stopbits)
+
+
+def inter_frame_gap(baudrate: int, bits_per_char: int = 11) -> float:
+    """Silencio de 3.5 caracteres entre tramas RTU, en segundos."""
+    baudrate = int(baudrate)
+    if baudrate <= 0:
+        raise ValueError(f"Baudrate inválido: {baudrate}")
+    if baudrate > FIXED_GAP_BAUDRATE:
+        return FIXED_GAP_SECONDS
+    return 3.5 * bits_per_char / baudrate
+
+
+@dataclass
+class BusStats:
+    """Ocupación acumulada del bus."""
+    transactions: int = 0
+    errors: int = 0
+    busy_time: float = 0.0
+    gap_time: float = 0.0
+    last_occupancy: float = 0.0
+    max_occupancy: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+    per_slave: Dict[int, float] = field(default_factory=dict)
+
+    def record(self, slave: Optional[int], occupancy: float, failed: bool) -> None:
+        self.transactions += 1
+        self.errors += int(failed)
+        self.busy_time += occupancy
+        self.last_occupancy = occupancy
+        self.max_occupancy = max(self.max_occupancy, occupancy)
+        if slave is not None:
+            self.per_slave[slave] = self.per_slave.get(slave, 0.0) + occupancy
+
+    @property
+    def utilization(self) -> float:
+        """Fracción del tiempo desde el arranque en la que el bus estuvo ocupado."""
+        elapsed = time.monotonic() - self.started_at
+        return (self.busy_time + self.gap_time) / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "transactions": self.transactions,
+            "errors": self.errors,
+            "busy_time": round(self.busy_time, 6),
+            "gap_time": round(self.gap_time, 6),
+            "last_occupancy": round(self.last_occupancy, 6),
+            "max_occupancy": round(self.max_occupancy, 6),
+            "utilization": round(self.utilization, 4),
+            "per_slave": {k: round(v, 6) for k, v in self.per_slave.items()},
+        }
+
+
+@dataclass
+class BusScheduler:
+    """
+    Dueño de un puerto serie half-duplex: ejecuta las transacciones de una en una,
+    en orden de llegada, respetando el silencio t3.5 entre tramas.
+    """
+    port: str
+    baudrate: int = 9600
+    bits_per_char: int = 11
+    gap: float = field(init=False)
+    stats: BusStats = field(init=False, default_factory=BusStats)
+    _queue: Optional[asyncio.Queue] = field(init=False, default=None, repr=False)
+    _worker: Optional[asyncio.Task] = field(init=False, default=None, repr=False)
+    _last_frame_end: float = field(init=False, default=0.0, repr=False)
+
+    def __post_init__(self):
+        self.gap = inter_frame_gap(self.baudrate, self.bits_per_char)
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """Arranca la tarea que atiende la cola del bus (requiere un event loop activo)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self.stats = BusStats()
+        self._worker = asyncio.create_task(self._run(), name=f"bus-{self.port}")
+        logger.info(f"Planificador de bus iniciado en {self.port} (t3.5 = {self.gap * 1000:.2f} ms)")
+
+    async def stop(self) -> None:
+        """Detiene el planificador y cancela las transacciones pendientes."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                future, *_ = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+        logger.info(f"Planificador de bus detenido en {self.port}")
+
+    async def submit(self, func: Callable[..., Awaitable[Any]], *args, slave: Optional[int] = None) -> Any:
+        """
+        Encola una transacción y espera su resultado.
+
+        :param func: Corrutina que realiza la transacción completa (petición + respuesta).
+        :param slave: Esclavo al que se atribuye la ocupación del bus.
+        """
+        if not self.running:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((future, func, args, slave))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            item: Tuple[asyncio.Future, Callable[..., Awaitable[Any]], tuple, Optional[int]] = await self._queue.get()
+            future, func, args, slave = item
+            if future.cancelled():
+                continue
+
+            wait = self._last_frame_end + self.gap - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self.stats.gap_time += wait
+
+            start = time.monotonic()
+            failed = False
+            try:
+                result = await func(*args)
+                failed = result is None
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                failed = True
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._last_frame_end = time.monotonic()
+                self.stats.record(slave, self._last_frame_end - start, failed)
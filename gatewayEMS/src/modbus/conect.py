@@ -1,23 +1,37 @@
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from src.Config.config import ConfigManager
 from src.Comunication.modbus import ModbusClientFactory
-from src.Config.devicemap import load_device_map, get_register_values
 from src.Model.model import NameParamsModbus
-from src.Utils.util import is_list_of_lists
 from src.Config.logs import logger
+from src.modbus.plan_cache import device_map_compiler
+from src.pipeline.deadband import DeadbandFilter
+
+# Pool de conexiones activo; se mantiene vivo entre ciclos de lectura
+_pool: Optional[ModbusClientFactory] = None
+
+
+def get_modbus_pool() -> Optional[ModbusClientFactory]:
+    """Devuelve el pool creado por get_modbus_clients (None si aún no existe)."""
+    return _pool
+
 
 async def get_modbus_clients() -> Dict[str, Dict[str, Any]]:
     """
     Configura y retorna un diccionario con los clientes Modbus listos para usar.
+    Si ya existía un pool se cierra antes de crear el nuevo.
     """
+    global _pool
     try:
+        if _pool is not None:
+            await _pool.close_all()
+
         config_manager = ConfigManager("src/Comunication/modbus.ini") 
         device_config = config_manager.get_device_config()
         logger.info(f"Dispositivos detectados: {list(device_config.keys())}")
 
-        modbus_client_factory = ModbusClientFactory(device_config)
-        clients = await modbus_client_factory.start_connection()
+        _pool = ModbusClientFactory(device_config)
+        clients = await _pool.start_connection()
         logger.info(f"Clientes configurados exitosamente: {list(clients.keys())}")
 
         # ✅ Ahora debes recorrer por port y luego por cada device
@@ -27,19 +41,27 @@ async def get_modbus_clients() -> Dict[str, Dict[str, Any]]:
             for device in client_info["devices"]:
                 logger.info(f"Procesando mapa de registros para: {device['name']}")
 
-                datos_map = load_device_map(device[NameParamsModbus.modbus_map_path])
-                datos_factorizado = get_register_values(datos_map)
-
-                if not is_list_of_lists(datos_factorizado):
-                    device[NameParamsModbus.list_address_init.value] = datos_factorizado[0]
-                    device[NameParamsModbus.list_count_address.value] = datos_factorizado[1]
-                    device[NameParamsModbus.modbus_map.value] = datos_map
+                # Plan compartido entre dispositivos con el mismo mapa y cacheado en disco
+                compiled = device_map_compiler.compile(
+                    device[NameParamsModbus.modbus_map_path],
+                    max_gap=device["max_gap"],
+                    max_block_size=device["max_block_size"],
+                )
+                device[NameParamsModbus.list_address_init.value] = compiled.addresses
+                device[NameParamsModbus.list_count_address.value] = compiled.counts
+                device[NameParamsModbus.modbus_map.value] = compiled.device_map
+                device["read_plan"] = compiled.plan
+                device["decode_layout"] = compiled.layout
+                device["compiled_map"] = compiled
+                # Estado de reporte por excepción propio de cada dispositivo
+                device["deadband"] = DeadbandFilter.for_layout(compiled.layout, compiled.device_map)
 
-                    # Eliminar el path ya que ya cargamos el mapa
-                    device.pop(NameParamsModbus.modbus_map_path, None)
+                # Eliminar el path ya que ya cargamos el mapa
+                device.pop(NameParamsModbus.modbus_map_path, None)
 
                 logger.info(f"Mapa de registros cargado correctamente para {device['name']}")
 
+        logger.info(f"Mapas compilados: {device_map_compiler.stats()}")
         logger.info("✅ Todos los clientes y dispositivos fueron configurados correctamente.")
         return clients
 
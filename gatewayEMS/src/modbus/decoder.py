@@ -0,0 +1,236 @@
+import math
+import struct
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Tipos admitidos en `data_type` del mapa: código struct o nombre explícito
+DATA_TYPES = {
+    "h": "h", "int16": "h",
+    "H": "H", "uint16": "H",
+    "i": "i", "int32": "i",
+    "I": "I", "uint32": "I",
+    "f": "f", "float32": "f",
+    "q": "q", "int64": "q",
+    "Q": "Q", "uint64": "Q",
+    "d": "d", "float64": "d",
+}
+
+
+def parse_address(value: Any) -> int:
+    """Admite direcciones enteras o en texto ("0x2006", "8198")."""
+    return value if isinstance(value, int) else int(str(value).strip(), 0)
+
+
+def _make_gather(indices: List[int]):
+    """Selector en C que siempre devuelve una tupla (itemgetter de un índice devuelve un escalar)."""
+    if len(indices) > 1:
+        return itemgetter(*indices)
+    if indices:
+        index = indices[0]
+        return lambda registers: (registers[index],)
+    return lambda registers: ()
+
+
+def _is_little(value: Any) -> bool:
+    return str(value or "big").strip().lower() in ("little", "swap", "swapped", "true", "1")
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """Un valor del mapa de registros ya resuelto."""
+    name: str
+    address: int
+    fmt: str
+    registers: int
+    scale: float = 1.0
+    offset: float = 0.0
+    word_swap: bool = False
+    byte_swap: bool = False
+
+    @classmethod
+    def from_map_entry(cls, name: str, entry: Dict[str, Any]) -> "FieldSpec":
+        data_type = str(entry.get("data_type", "H")).strip()
+        fmt = DATA_TYPES.get(data_type) or DATA_TYPES.get(data_type.lower())
+        if fmt is None:
+            raise ValueError(f"Tipo de dato no soportado en {name}: {data_type}")
+        return cls(
+            name=name,
+            address=parse_address(entry["address"]),
+            fmt=fmt,
+            registers=struct.calcsize(fmt) // 2,
+            scale=float(entry.get("gain", 1)),
+            offset=float(entry.get("offset", 0)),
+            word_swap=_is_little(entry.get("word_order")),
+            byte_swap=_is_little(entry.get("byte_order")),
+        )
+
+
+@dataclass
+class DecodeLayout:
+    """
+    Plan de decodificación precompilado de un mapa de registros.
+
+    El búfer de entrada es la lista plana de registros que devuelve
+    read_registers (rangos concatenados en el orden de `spans`). Al compilar se
+    calcula, para todo el mapa, qué registro del búfer va en cada posición de
+    un único struct big-endian, de modo que decodificar un dispositivo son dos
+    llamadas a struct (pack + unpack) más el escalado de los campos con
+    gain/offset distintos de 1/0. Los registros a None (bloques que no se
+    pudieron leer) dejan en NaN solo los campos que los usan.
+    """
+    fields: List[FieldSpec]
+    spans: List[Tuple[int, int]]
+    buffer_size: int = field(init=False)
+    _names: Tuple[str, ...] = field(init=False, repr=False)
+    _gather: Any = field(init=False, repr=False)
+    _gather_size: int = field(init=False, repr=False)
+    _sources: Tuple[Tuple[int, ...], ...] = field(init=False, repr=False)
+    _byte_swap: Tuple[int, ...] = field(init=False, repr=False)
+    _values: struct.Struct = field(init=False, repr=False)
+    _scaled: Tuple[Tuple[int, float, float], ...] = field(init=False, repr=False)
+
+    @classmethod
+    def compile(cls, device_map: Dict[str, Dict[str, Any]], spans: Optional[Iterable[Tuple[int, int]]] = None) -> "DecodeLayout":
+        """
+        :param device_map: Mapa cargado con load_device_map ({nombre: {address, data_type, gain, ...}}).
+        :param spans: Orden de los rangos (address, count) en el búfer. Por defecto
+                      un rango por campo, ordenados por dirección.
+        """
+        fields = [FieldSpec.from_map_entry(name, entry) for name, entry in device_map.items() if isinstance(entry, dict)]
+        fields.sort(key=lambda f: f.address)
+        if spans is None:
+            spans = [(f.address, f.registers) for f in fields]
+        return cls(fields=fields, spans=[(int(a), int(c)) for a, c in spans])
+
+    def __post_init__(self):
+        starts = []
+        position = 0
+        for address, count in self.spans:
+            starts.append((address, count, position))
+            position += count
+        self.buffer_size = position
+
+        gather: List[int] = []
+        byte_swap: List[int] = []
+        sources: List[Tuple[int, ...]] = []
+        for spec in self.fields:
+            base = self.__locate(spec, starts)
+            words = list(range(base, base + spec.registers))
+            sources.append(tuple(words))
+            if spec.word_swap:
+                words.reverse()
+            if spec.byte_swap:
+                byte_swap.extend(range(len(gather), len(gather) + spec.registers))
+            gather.extend(words)
+
+        self._names = tuple(spec.name for spec in self.fields)
+        self._gather_size = len(gather)
+        self._gather = _make_gather(gather)
+        self._sources = tuple(sources)
+        self._byte_swap = tuple(byte_swap)
+        self._values = struct.Struct(">" + "".join(spec.fmt for spec in self.fields))
+        self._scaled = tuple(
+            (i, spec.scale, spec.offset)
+            for i, spec in enumerate(self.fields)
+            if spec.scale != 1.0 or spec.offset != 0.0
+        )
+
+    @property
+    def addresses(self) -> List[int]:
+        return [address for address, _ in self.spans]
+
+    @property
+    def counts(self) -> List[int]:
+        return [count for _, count in self.spans]
+
+    def decode(self, registers: Sequence[int]) -> Dict[str, float]:
+        """Decodifica los registros de un dispositivo en {nombre: valor}."""
+        return dict(zip(self._names, self.decode_values(registers)))
+
+    def decode_values(self, registers: Sequence[int]) -> List[float]:
+        """Igual que decode pero devuelve los valores en el orden de `fields`."""
+        if len(registers) != self.buffer_size:
+            raise ValueError(f"Se esperaban {self.buffer_size} registros y se recibieron {len(registers)}")
+        registers, invalid = self.__fill(registers)
+        words = self.__words(registers)
+        raw = struct.pack(f">{self._gather_size}H", *words)
+        return self.__invalidate(self.__scale(list(self._values.unpack(raw))), invalid)
+
+    def decode_batch(self, buffers: Sequence[Sequence[int]]) -> List[Dict[str, float]]:
+        """
+        Decodifica varios dispositivos con el mismo mapa en una sola pasada:
+        un pack de todos los registros y struct.iter_unpack sobre el búfer contiguo.
+        """
+        if not buffers:
+            return []
+        words: List[int] = []
+        invalid: List[List[int]] = []
+        for registers in buffers:
+            if len(registers) != self.buffer_size:
+                raise ValueError(f"Se esperaban {self.buffer_size} registros y se recibieron {len(registers)}")
+            registers, missing = self.__fill(registers)
+            invalid.append(missing)
+            words.extend(self.__words(registers))
+        raw = struct.pack(f">{len(words)}H", *words)
+        names = self._names
+        return [
+            dict(zip(names, self.__invalidate(self.__scale(list(values)), missing)))
+            for values, missing in zip(self._values.iter_unpack(raw), invalid)
+        ]
+
+    def __fill(self, registers: Sequence[Optional[int]]) -> Tuple[Sequence[int], List[int]]:
+        """Sustituye los registros None por 0 y devuelve los campos que los usan."""
+        if None not in registers:
+            return registers, []
+        missing = {i for i, word in enumerate(registers) if word is None}
+        invalid = [i for i, words in enumerate(self._sources) if not missing.isdisjoint(words)]
+        return [0 if word is None else word for word in registers], invalid
+
+    @staticmethod
+    def __invalidate(values: List[float], invalid: List[int]) -> List[float]:
+        for i in invalid:
+            values[i] = math.nan
+        return values
+
+    def __words(self, registers: Sequence[int]) -> List[int]:
+        words = list(self._gather(registers))
+        for i in self._byte_swap:
+            w = words[i]
+            words[i] = ((w & 0xFF) << 8) | (w >> 8)
+        return words
+
+    def __scale(self, values: List[float]) -> List[float]:
+        for i, scale, offset in self._scaled:
+            values[i] = values[i] * scale + offset
+        return values
+
+    @staticmethod
+    def __locate(spec: FieldSpec, starts: List[Tuple[int, int, int]]) -> int:
+        for address, count, position in starts:
+            if address <= spec.address and spec.address + spec.registers <= address + count:
+                return position + spec.address - address
+        raise ValueError(f"El campo {spec.name} (address {spec.address}) no está cubierto por los rangos leídos")
+
+
+def decode_cycle(readings: Iterable[Tuple[str, DecodeLayout, Sequence[int]]]) -> Dict[str, Dict[str, float]]:
+    """
+    Decodifica un ciclo completo de bus. Agrupa los dispositivos que comparten
+    layout para decodificarlos juntos con decode_batch.
+
+    :param readings: Tuplas (dispositivo, layout, registros); los registros
+                     None (bloques fallidos) dejan en NaN sus campos.
+    :return: {dispositivo: {nombre: valor}}
+    """
+    groups: Dict[int, Tuple[DecodeLayout, List[str], List[Sequence[int]]]] = {}
+    for device, layout, registers in readings:
+        if len(registers) != layout.buffer_size:
+            continue
+        group = groups.setdefault(id(layout), (layout, [], []))
+        group[1].append(device)
+        group[2].append(registers)
+
+    result: Dict[str, Dict[str, float]] = {}
+    for layout, devices, buffers in groups.values():
+        result.update(zip(devices, layout.decode_batch(buffers)))
+    return result
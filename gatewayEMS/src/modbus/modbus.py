@@ -1,23 +1,84 @@
 import asyncio
+import random
+import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
 from src.Model.model import NameParamsModbus, ProtocolCom
+from src.modbus.planner import DEFAULT_MAX_GAP, MAX_REGISTERS_PER_READ
+from src.modbus.bus import BusScheduler, character_bits
+from src.modbus.breaker import BreakerRegistry
 from src.Config.logs import logger
 
+
+@dataclass
+class BackoffPolicy:
+    """Backoff exponencial con jitter completo para las reconexiones."""
+    base: float = 0.5
+    factor: float = 2.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int) -> float:
+        """Espera antes del intento `attempt` (1 = primer reintento)."""
+        ceiling = min(self.max_delay, self.base * (self.factor ** max(0, attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+@dataclass
+class ConnectionStats:
+    """Contadores de conexión de un puerto serie o host."""
+    connects: int = 0
+    reconnects: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    connected_since: Optional[float] = None
+    next_attempt_at: float = 0.0
+    last_connect_latency: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_connect_latency": round(self.last_connect_latency, 4),
+            "uptime": round(time.monotonic() - self.connected_since, 3) if self.connected_since else 0.0,
+        }
+
+
 @dataclass
 class ModbusClientFactory:
     """
     Dataclass for creating and managing Modbus clients agrupados por puerto/IP.
+
+    Funciona como pool de conexiones de larga duración: los clientes permanecen
+    abiertos entre ciclos de lectura, una tarea de salud los revisa cada
+    `health_interval` segundos y los enlaces caídos se reconectan con backoff.
     """
     config_dict: Dict[str, Dict[str, Any]]
+    backoff: BackoffPolicy = field(default_factory=BackoffPolicy)
+    health_interval: float = 5.0
+    connect_timeout: float = 5.0
+    max_concurrent_connects: int = 32
     clients: Dict[str, Dict[str, Any]] = field(init=False, default_factory=dict)
+    stats: Dict[str, ConnectionStats] = field(init=False, default_factory=dict)
+    _health_task: Optional[asyncio.Task] = field(init=False, default=None, repr=False)
 
     async def start_connection(self) -> Dict[str, Dict[str, Any]]:
         """
         Agrupa y conecta clientes Modbus por puerto/IP.
 
-        :return: Diccionario { puerto/IP : { client: ..., devices: [...] } }
+        Todos los puertos/hosts se conectan en paralelo (como mucho
+        `max_concurrent_connects` a la vez y `connect_timeout` segundos cada uno).
+        Los que fallan quedan registrados sin conexión y la tarea de salud los
+        reintenta en segundo plano con backoff, sin retrasar a los demás; usar
+        `ensure_connected` antes de leer.
+
+        :return: Diccionario { puerto/IP : { client: ..., scheduler: ..., breakers: ..., devices: [...] } }
+                 `scheduler` es un BusScheduler para puertos RTU y None para TCP;
+                 `breakers` agrupa los circuit breakers de los esclavos del puerto/host.
         """
         self.clients = {}
 
@@ -32,33 +93,13 @@ class ModbusClientFactory:
                 continue
 
             try:
-                # Si no existe el cliente aún, crearlo
+                # Si no existe el cliente aún, crearlo (la conexión se hace después, en paralelo)
                 if client_key not in self.clients:
-                    if protocol == ProtocolCom.RTU:
-                        client = AsyncModbusSerialClient(
-                            port=client_key,
-                            baudrate=device_config.get(NameParamsModbus.baudrate),
-                        )
-                    elif protocol == ProtocolCom.TCP:
-                        client = AsyncModbusTcpClient(
-                            host=client_key,
-                            port=device_config.get(NameParamsModbus.port),
-                        )
-                    else:
+                    client_info = self.__create_client(client_key, protocol, device_config)
+                    if client_info is None:
                         logger.warning(f"Protocolo no mapeado para {device_name}")
                         continue
-
-                    await client.connect()
-                    if not client.connected:
-                        logger.error(f"Cliente {client_key} no pudo conectarse.")
-                        await self.__end_connection(client)
-                        continue
-
-                    self.clients[client_key] = {
-                        "client": client,
-                        "devices": []
-                    }
-                    logger.info(f"Cliente creado y conectado para {client_key}")
+                    self.clients[client_key] = client_info
 
                 # Registrar dispositivo al cliente ya existente
                 self.clients[client_key]["devices"].append({
@@ -66,21 +107,185 @@ class ModbusClientFactory:
                     "slave": device_config.get(NameParamsModbus.slave_id),
                     "modbus_function": device_config.get(NameParamsModbus.modbus_function),
                     "modbus_map_path": device_config.get(NameParamsModbus.modbus_map_path),
+                    "max_gap": int(device_config.get("max_gap", DEFAULT_MAX_GAP)),
+                    "max_block_size": int(device_config.get("max_block_size", MAX_REGISTERS_PER_READ)),
+                    # Intervalo de sondeo por defecto del dispositivo (None = el de [MAIN_MODBUS])
+                    "interval": device_config.get("interval"),
                 })
                 logger.info(f"Dispositivo {device_name} agregado al cliente {client_key}")
 
-            except (asyncio.TimeoutError, AssertionError) as e:
-                logger.error(f"Error de conexión con {device_name}: {e}")
             except Exception as e:
                 logger.exception(f"Error inesperado con {device_name}: {e}")
 
-        return self.clients  
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_connects))
+
+        async def connect_endpoint(client_key: str) -> bool:
+            async with semaphore:
+                stats = self.stats.setdefault(client_key, ConnectionStats())
+                return await self.__connect(client_key, self.clients[client_key]["client"], stats)
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(connect_endpoint(key) for key in self.clients))
+        failed = [key for key, ok in zip(self.clients, results) if not ok]
+        logger.info(
+            f"{len(self.clients) - len(failed)}/{len(self.clients)} clientes conectados en "
+            f"{time.monotonic() - started:.2f}s"
+        )
+        if failed:
+            logger.error(f"Clientes sin conexión, se reintentan en segundo plano: {failed}")
+
+        self.start_health_check()
+        return self.clients
+
+    async def ensure_connected(self, client_key: str) -> bool:
+        """
+        Devuelve True si el cliente está conectado. Si el enlace cayó, intenta
+        reconectar respetando el backoff; mientras no toque reintentar devuelve False.
+        """
+        client_info = self.clients.get(client_key)
+        if client_info is None:
+            return False
+
+        client = client_info["client"]
+        if client.connected:
+            return True
+
+        stats = self.stats.setdefault(client_key, ConnectionStats())
+        if stats.connected_since is not None:
+            logger.warning(f"Conexión perdida con {client_key}")
+            stats.connected_since = None
+
+        if time.monotonic() < stats.next_attempt_at:
+            return False
+
+        if await self.__connect(client_key, client, stats, reconnect=True):
+            logger.info(f"Reconectado con {client_key} tras {stats.reconnects} reconexiones")
+            return True
+        return False
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores de conexión por puerto/host, con el estado actual del enlace."""
+        result = {}
+        for client_key, stats in self.stats.items():
+            client_info = self.clients.get(client_key)
+            data = stats.as_dict()
+            data["connected"] = bool(client_info and client_info["client"].connected)
+            result[client_key] = data
+        return result
+
+    def get_breaker_states(self) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """Estado de los circuit breakers por puerto/host y esclavo."""
+        return {client_key: client_info["breakers"].snapshot() for client_key, client_info in self.clients.items()}
+
+    def start_health_check(self) -> None:
+        """Arranca la tarea periódica que revisa y reconecta los enlaces."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self.__health_loop(), name="modbus-pool-health")
+
+    async def close_all(self) -> None:
+        """Detiene la revisión de salud, los planificadores de bus y cierra todos los clientes."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        for client_key, client_info in self.clients.items():
+            scheduler = client_info.get("scheduler")
+            if scheduler is not None:
+                await scheduler.stop()
+            await self.__end_connection(client_info.get("client"))
+            stats = self.stats.get(client_key)
+            if stats is not None:
+                stats.connected_since = None
+        self.clients = {}
+
+    async def __health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for client_key in list(self.clients.keys()):
+                try:
+                    await self.ensure_connected(client_key)
+                except Exception as e:
+                    logger.error(f"Error revisando la conexión {client_key}: {e}")
+
+    def __create_client(self, client_key: str, protocol: Any, device_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Crea (sin conectar) el cliente y, en RTU, el planificador de su bus."""
+        scheduler = None
+        if protocol == ProtocolCom.RTU:
+            # reconnect_delay=0: la reconexión la gestiona el pool, no pymodbus
+            client = AsyncModbusSerialClient(
+                port=client_key,
+                baudrate=device_config.get(NameParamsModbus.baudrate),
+                reconnect_delay=0,
+            )
+            # Un solo planificador por puerto serie: el bus es half-duplex
+            scheduler = BusScheduler(
+                port=client_key,
+                baudrate=int(device_config.get(NameParamsModbus.baudrate) or 9600),
+                bits_per_char=character_bits(
+                    databits=int(device_config.get("databits") or 8),
+                    parity=device_config.get("parity"),
+                    stopbits=int(device_config.get("stopbits") or 1),
+                ),
+            )
+            scheduler.start()
+        elif protocol == ProtocolCom.TCP:
+            client = AsyncModbusTcpClient(
+                host=client_key,
+                port=device_config.get(NameParamsModbus.port),
+                reconnect_delay=0,
+            )
+        else:
+            return None
+
+        return {
+            "client": client,
+            "scheduler": scheduler,
+            "breakers": BreakerRegistry.from_config(client_key),
+            "devices": []
+        }
+
+    async def __connect(self, client_key: str, client: Union[AsyncModbusSerialClient, AsyncModbusTcpClient], stats: ConnectionStats, reconnect: bool = False) -> bool:
+        """Intenta conectar (con timeout) y actualiza contadores, latencia y backoff."""
+        error = "connect() sin conexión"
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(client.connect(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            error = f"timeout de conexión ({self.connect_timeout}s)"
+        except Exception as e:
+            error = str(e)
+        stats.last_connect_latency = time.monotonic() - started
+
+        if client.connected:
+            logger.info(f"Cliente {client_key} conectado en {stats.last_connect_latency * 1000:.0f} ms")
+            stats.connects += 1
+            stats.reconnects += int(reconnect)
+            stats.consecutive_failures = 0
+            stats.connected_since = time.monotonic()
+            stats.next_attempt_at = 0.0
+            return True
+
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.last_error = error
+        delay = self.backoff.delay(stats.consecutive_failures)
+        stats.next_attempt_at = time.monotonic() + delay
+        logger.warning(
+            f"Fallo de conexión con {client_key} tras {stats.last_connect_latency * 1000:.0f} ms: {error} "
+            f"(#{stats.consecutive_failures}), siguiente intento en {delay:.1f}s"
+        )
+        return False
 
     async def __end_connection(self, client):
         """Cierra conexión del cliente"""
         if client:
             try:
-                await client.close()
+                # close() es síncrono en pymodbus 3.x
+                client.close()
                 logger.info("Conexión cerrada correctamente")
             except Exception as e:
-                logger.error(f"No se pudo cerrar la conexión: {e}")
\ No newline at end of file
+                logger.error(f"No se pudo cerrar la conexión: {e}")
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.modbus.decoder import DecodeLayout, FieldSpec
+from src.modbus.planner import DEFAULT_MAX_GAP, MAX_REGISTERS_PER_READ, ReadBlock, ReadPlan, RegisterSpan, build_read_plan
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Subir al cambiar el formato del plan compilado para invalidar la caché en disco
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = "src/cache/device_maps"
+
+
+@dataclass
+class CompiledDeviceMap:
+    """Mapa de registros compilado: plan de lectura + layout de decodificación."""
+    digest: str
+    device_map: Dict[str, Any]
+    plan: ReadPlan
+    layout: DecodeLayout
+
+    @property
+    def addresses(self) -> List[int]:
+        return self.layout.addresses
+
+    @property
+    def counts(self) -> List[int]:
+        return self.layout.counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        index = {span: i for i, span in enumerate(self.plan.spans)}
+        return {
+            "version": CACHE_VERSION,
+            "digest": self.digest,
+            "device_map": self.device_map,
+            "fields": [asdict(spec) for spec in self.layout.fields],
+            "spans": [[span.address, span.count] for span in self.plan.spans],
+            "blocks": [[block.address, block.count, [index[span] for span in block.spans]] for block in self.plan.blocks],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompiledDeviceMap":
+        spans = [RegisterSpan(address, count) for address, count in data["spans"]]
+        blocks = [
+            ReadBlock(address=address, count=count, spans=[spans[i] for i in members])
+            for address, count, members in data["blocks"]
+        ]
+        fields = [FieldSpec(**spec) for spec in data["fields"]]
+        return cls(
+            digest=data["digest"],
+            device_map=data["device_map"],
+            plan=ReadPlan(blocks=blocks, spans=spans),
+            layout=DecodeLayout(fields=fields, spans=[(span.address, span.count) for span in spans]),
+        )
+
+
+class DeviceMapCompiler:
+    """
+    Compila mapas de registros una sola vez.
+
+    Los planes se identifican por el hash del contenido del mapa y los
+    parámetros de fusión, de modo que todos los dispositivos que comparten un
+    modelo reutilizan el mismo objeto en memoria, y se guardan en disco para
+    que un reinicio con los mismos mapas no tenga que volver a derivarlos.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._compiled: Dict[Tuple[str, int, int], CompiledDeviceMap] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def compile(self, map_path: str, max_gap: int = DEFAULT_MAX_GAP, max_block_size: int = MAX_REGISTERS_PER_READ) -> CompiledDeviceMap:
+        """
+        Devuelve el plan compilado del mapa `map_path`.
+
+        :raises FileNotFoundError: Si el mapa no existe.
+        :raises ValueError: Si el mapa no es válido.
+        """
+        with open(map_path, "rb") as file:
+            content = file.read()
+        return self.__compile(hashlib.sha256(content).hexdigest(), lambda: json.loads(content), max_gap, max_block_size)
+
+    def compile_map(self, device_map: Dict[str, Any], max_gap: int = DEFAULT_MAX_GAP, max_block_size: int = MAX_REGISTERS_PER_READ) -> CompiledDeviceMap:
+        """Igual que compile pero a partir de un mapa ya cargado (p. ej. los canales de un intervalo)."""
+        content = json.dumps(device_map, sort_keys=True, separators=(",", ":")).encode()
+        return self.__compile(hashlib.sha256(content).hexdigest(), lambda: device_map, max_gap, max_block_size)
+
+    def stats(self) -> Dict[str, int]:
+        return {"compiled": len(self._compiled), "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def __compile(self, digest: str, load: Callable[[], Dict[str, Any]], max_gap: int, max_block_size: int) -> CompiledDeviceMap:
+        key = (digest, int(max_gap), int(max_block_size))
+
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+
+        compiled = self.__load(key)
+        if compiled is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            compiled = self.__build(digest, load(), max_gap, max_block_size)
+            self.__store(key, compiled)
+
+        self._compiled[key] = compiled
+        return compiled
+
+    @staticmethod
+    def __build(digest: str, device_map: Dict[str, Any], max_gap: int, max_block_size: int) -> CompiledDeviceMap:
+        layout = DecodeLayout.compile(device_map)
+        plan = build_read_plan(layout.addresses, layout.counts, max_gap=max_gap, max_block_size=max_block_size)
+        return CompiledDeviceMap(digest=digest, device_map=device_map, plan=plan, layout=layout)
+
+    def __cache_file(self, key: Tuple[str, int, int]) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        digest, max_gap, max_block_size = key
+        return self.cache_dir / f"{digest}-g{max_gap}-b{max_block_size}-v{CACHE_VERSION}.json"
+
+    def __load(self, key: Tuple[str, int, int]) -> Optional[CompiledDeviceMap]:
+        path = self.__cache_file(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+            if data.get("version") != CACHE_VERSION or data.get("digest") != key[0]:
+                return None
+            return CompiledDeviceMap.from_dict(data)
+        except Exception as e:
+            logger.warning(f"Plan en caché inválido {path.name}, se recompila: {e}")
+            return None
+
+    def __store(self, key: Tuple[str, int, int], compiled: CompiledDeviceMap) -> None:
+        path = self.__cache_file(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica para no dejar ficheros a medias si el proceso muere
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as file:
+                json.dump(compiled.to_dict(), file)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el plan compilado en {path}: {e}")
+
+
+device_map_compiler = DeviceMapCompiler()
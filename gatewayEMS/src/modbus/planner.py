@@ -0,0 +1,130 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Límite de registros por petición 0x03/0x04 impuesto por el tamaño del PDU Modbus
+MAX_REGISTERS_PER_READ = 125
+# Registros no mapeados que se permiten leer entre dos rangos para fusionarlos
+DEFAULT_MAX_GAP = 0
+
+
+@dataclass(frozen=True)
+class RegisterSpan:
+    """Rango (address, count) solicitado por el mapa de registros."""
+    address: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+
+@dataclass
+class ReadBlock:
+    """
+    Petición Modbus fusionada que cubre uno o varios RegisterSpan.
+    """
+    address: int
+    count: int
+    spans: List[RegisterSpan] = field(default_factory=list)
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+    def extract(self, registers: Sequence[int]) -> Dict[RegisterSpan, List[int]]:
+        """Recorta la respuesta del bloque en los rangos originales."""
+        result = {}
+        for span in self.spans:
+            offset = span.address - self.address
+            result[span] = list(registers[offset:offset + span.count])
+        return result
+
+
+@dataclass
+class ReadPlan:
+    """
+    Plan de lectura de un dispositivo: bloques a pedir y orden original de los rangos.
+    """
+    blocks: List[ReadBlock]
+    spans: List[RegisterSpan]
+
+    @property
+    def request_count(self) -> int:
+        return len(self.blocks)
+
+    @property
+    def register_count(self) -> int:
+        return sum(block.count for block in self.blocks)
+
+    def assemble(self, block_data: Sequence[Optional[Sequence[int]]]) -> Dict[RegisterSpan, Optional[List[int]]]:
+        """
+        Convierte las respuestas de cada bloque (mismo orden que `blocks`) en un
+        diccionario por rango. Los rangos de un bloque fallido quedan en None.
+        """
+        per_span: Dict[RegisterSpan, Optional[List[int]]] = {}
+        for block, registers in zip(self.blocks, block_data):
+            if registers is None or len(registers) < block.count:
+                for span in block.spans:
+                    per_span[span] = None
+                continue
+            per_span.update(block.extract(registers))
+        return per_span
+
+    def flatten(self, block_data: Sequence[Optional[Sequence[int]]]) -> List[Optional[int]]:
+        """
+        Concatena los registros en el orden original de los rangos, igual que
+        la lectura sin planificar. Los rangos fallidos se rellenan con None
+        para que el resto de registros conserve su posición.
+        """
+        per_span = self.assemble(block_data)
+        flat: List[Optional[int]] = []
+        for span in self.spans:
+            registers = per_span.get(span)
+            flat.extend(registers if registers is not None else [None] * span.count)
+        return flat
+
+
+def build_read_plan(
+    address: Iterable[int],
+    count: Iterable[int],
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_block_size: int = MAX_REGISTERS_PER_READ,
+) -> ReadPlan:
+    """
+    Fusiona rangos adyacentes o cercanos en el menor número de peticiones.
+
+    :param address: Direcciones iniciales de cada rango del mapa.
+    :param count: Número de registros de cada rango.
+    :param max_gap: Registros no solicitados que se toleran entre dos rangos fusionados.
+    :param max_block_size: Tamaño máximo de un bloque (nunca mayor que 125).
+    :return: ReadPlan con los bloques ordenados por dirección.
+    """
+    spans = [RegisterSpan(int(a), int(c)) for a, c in zip(address, count)]
+    max_block_size = max(1, min(int(max_block_size), MAX_REGISTERS_PER_READ))
+    max_gap = max(0, int(max_gap))
+
+    for span in spans:
+        if span.count <= 0:
+            raise ValueError(f"Rango inválido en address {span.address}: count {span.count}")
+        if span.count > max_block_size:
+            raise ValueError(
+                f"El rango en address {span.address} ({span.count} registros) supera el bloque máximo {max_block_size}"
+            )
+
+    blocks: List[ReadBlock] = []
+    current: Optional[ReadBlock] = None
+
+    # Los rangos repetidos se leen una sola vez
+    for span in sorted(set(spans), key=lambda s: (s.address, s.count)):
+        if current is not None:
+            new_end = max(current.end, span.end)
+            gap = span.address - current.end
+            if gap <= max_gap and new_end - current.address <= max_block_size:
+                current.count = new_end - current.address
+                current.spans.append(span)
+                continue
+        current = ReadBlock(address=span.address, count=span.count, spans=[span])
+        blocks.append(current)
+
+    return ReadPlan(blocks=blocks, spans=spans)
+
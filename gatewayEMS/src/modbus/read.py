@@ -1,12 +1,17 @@
 
 from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
 import asyncio
-from typing import Dict, List, Optional, Union
+import time
+from typing import Dict, List, Optional, Tuple, Union
 from src.Config.logs import logger
+from src.modbus.breaker import BreakerRegistry, SlaveCircuitBreaker
+from src.modbus.bus import BusScheduler
+from src.modbus.planner import DEFAULT_MAX_GAP, MAX_REGISTERS_PER_READ, ReadPlan, build_read_plan
 
-async def read_slave_data(client: Union[AsyncModbusSerialClient, AsyncModbusTcpClient], slave: int, address: int, count: int, function_code: int = 3) -> Optional[List[int]]:
+async def read_slave_data(client: Union[AsyncModbusSerialClient, AsyncModbusTcpClient], slave: int, address: int, count: int, function_code: int = 3, timeout: Optional[float] = None) -> Optional[List[int]]:
     """
     Lee registros de un solo esclavo en una dirección específica.
+    Con `timeout` la petición se abandona pasados esos segundos.
     """
     try:
         if not client.connected:
@@ -16,8 +21,9 @@ async def read_slave_data(client: Union[AsyncModbusSerialClient, AsyncModbusTcpC
         if function_code not in [3, 4]:
             raise ValueError("Código de función inválido. Debe ser 3 (read holding) o 4 (read input).")
 
-        response = await client.read_holding_registers(address=address, count=count, slave=slave) if function_code == 3 \
-            else await client.read_input_registers(address=address, count=count, slave=slave)
+        request = client.read_holding_registers(address=address, count=count, device_id=slave) if function_code == 3 \
+            else client.read_input_registers(address=address, count=count, device_id=slave)
+        response = await (asyncio.wait_for(request, timeout) if timeout else request)
 
         if response.isError():
             logger.error(f"❌ Error al leer registros del esclavo {slave}, address {address}, count {count}: {response}")
@@ -25,6 +31,11 @@ async def read_slave_data(client: Union[AsyncModbusSerialClient, AsyncModbusTcpC
 
         return response.registers
 
+    except asyncio.TimeoutError:
+        # Sin timeout propio el TimeoutError viene del cliente pymodbus
+        limit = f"{timeout:.3f}s" if timeout is not None else "cliente"
+        logger.warning(f"⏱️ Timeout ({limit}) leyendo el esclavo {slave}, address {address}")
+        return None
     except Exception as e:
         # No cerramos el cliente aquí, solo registramos el error y continuamos
         logger.error(f"⚠️ Error inesperado al leer registros del esclavo {slave}: {e}")
@@ -36,18 +47,36 @@ async def read_registers(
     slave: Union[int, List[int]], 
     address: Union[int, List[int]], 
     count: Union[int, List[int]],
-    function_code: int = 3
-) -> Dict[int, List[int]]:
+    function_code: int = 3,
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_block_size: int = MAX_REGISTERS_PER_READ,
+    scheduler: Optional[BusScheduler] = None,
+    plan: Optional[ReadPlan] = None,
+    breakers: Optional[BreakerRegistry] = None,
+) -> Dict[int, List[Optional[int]]]:
     """
     Reads Modbus registers and returns a dictionary structured by `slave_id`.
+
+    The (address, count) pairs are merged into as few requests as possible with
+    `build_read_plan` (`max_gap` unmapped registers tolerated between ranges,
+    blocks of at most `max_block_size` registers) and the responses are sliced
+    back so the result keeps the original register order; registers of a
+    block that failed are None, so every other register keeps its position
+    (DecodeLayout turns only the affected channels into NaN). A precompiled
+    `plan` (see plan_cache) skips the planning step entirely.
+
+    When a `scheduler` is given (RTU ports) every request goes through its
+    single transaction queue instead of competing for the serial line.
+
+    With `breakers`, slaves whose circuit breaker is open are skipped (absent
+    from the result) and every request uses the slave's adaptive timeout. Each
+    polled slave records one breaker outcome per call, not one per block.
     """
     resultados = {}
 
+    # La conexión es persistente y la reconecta el pool (ModbusClientFactory.ensure_connected)
     if not client.connected:
-        await client.connect()
-    
-    if not client.connected:
-        logger.error("Cliente Modbus no conectado después del intento de reconexión.")
+        logger.error("Cliente Modbus no conectado.")
         raise ConnectionError("Cliente Modbus no conectado.")
 
     if isinstance(slave, int):
@@ -61,7 +90,48 @@ async def read_registers(
         logger.error("`address` y `count` deben ser listas del mismo tamaño.")
         raise ValueError("`address` y `count` deben ser listas del mismo tamaño.")
 
-    tasks = {s: asyncio.gather(*(read_slave_data(client, s, a, c, function_code) for a, c in zip(address, count))) for s in slave}
+    if plan is None:
+        plan = build_read_plan(address, count, max_gap=max_gap, max_block_size=max_block_size)
+    logger.debug(f"Plan de lectura: {len(plan.spans)} rangos -> {plan.request_count} peticiones ({plan.register_count} registros)")
+
+    async def read_block(s: int, block_address: int, block_count: int, breaker: Optional[SlaveCircuitBreaker]) -> Tuple[Optional[List[int]], float]:
+        """Lee un bloque y devuelve (registros, duración de la transacción)."""
+
+        async def transaction() -> Tuple[Optional[List[int]], float]:
+            if breaker is None:
+                return await read_slave_data(client, s, block_address, block_count, function_code), 0.0
+            started = time.monotonic()
+            registers = await read_slave_data(client, s, block_address, block_count, function_code, timeout=breaker.timeout.current)
+            return registers, time.monotonic() - started
+
+        if scheduler is None:
+            return await transaction()
+        return await scheduler.submit(transaction, slave=s)
+
+    async def read_slave(s: int) -> List[Optional[List[int]]]:
+        """
+        Lee todos los bloques de un esclavo. El breaker registra un único
+        resultado por ciclo, igual que admite el esclavo una vez por ciclo: un
+        fallo si falla algún bloque o un éxito con el RTT de la transacción
+        más lenta del ciclo.
+        """
+        breaker = breakers.get(s) if breakers is not None else None
+        results = await asyncio.gather(*(read_block(s, block.address, block.count, breaker) for block in plan.blocks))
+        if breaker is not None and results:
+            rtts = [rtt for registers, rtt in results if registers is not None]
+            if len(rtts) < len(results):
+                breaker.record_failure()
+            else:
+                breaker.record_success(max(rtts))
+        return [registers for registers, _ in results]
+
+    if breakers is not None:
+        skipped = [s for s in slave if not breakers.get(s).allow()]
+        if skipped:
+            logger.debug(f"Esclavos omitidos por circuit breaker abierto: {skipped}")
+        slave = [s for s in slave if s not in skipped]
+
+    tasks = {s: read_slave(s) for s in slave}
 
     responses = await asyncio.gather(*tasks.values(), return_exceptions=True)
 
@@ -69,7 +139,9 @@ async def read_registers(
         if isinstance(res_list, Exception):
             logger.error(f"Error en lectura del esclavo {s}: {res_list}")
             continue
-        resultados[s] = [item for sublist in res_list if sublist for item in sublist]
-        logger.info(f"Lectura consolidada del esclavo {s}: {len(resultados[s])} registros leídos.")
-    client.close()
+        resultados[s] = plan.flatten(res_list)
+        missing = resultados[s].count(None)
+        if missing:
+            logger.warning(f"Esclavo {s}: {missing} de {len(resultados[s])} registros sin leer.")
+        logger.info(f"Lectura consolidada del esclavo {s}: {len(resultados[s]) - missing} registros leídos.")
     return resultados
\ No newline at end of file
@@ -0,0 +1,455 @@
+import asyncio
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+import paho.mqtt.client as mqtt
+from src.config.config import configManager
+from src.storage.spool import DiskSpool, SpoolRecord
+from src.transport.frame import FrameRow, encode_frame
+from src.transport.frame import encode_json as encode_frame_json
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# (timestamp, {canal: valor}) de un dispositivo en un ciclo de sondeo
+CycleSample = Tuple[float, Dict[str, float]]
+PayloadEncoder = Callable[[str, List[CycleSample]], bytes]
+
+# Muestras de latencia conservadas para los percentiles
+LATENCY_WINDOW = 1024
+# Registro del spool: longitud del topic + topic + payload
+SPOOLED_TOPIC = struct.Struct("<H")
+
+
+class QueuePolicy(str, Enum):
+    """Qué hacer cuando la cola de publicación está llena"""
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
+def encode_binary(device: str, samples: List[CycleSample]) -> bytes:
+    """Payload en el formato binario de src/transport/frame.py."""
+    return encode_frame(FrameRow(device, timestamp, values) for timestamp, values in samples)
+
+
+def encode_json(device: str, samples: List[CycleSample]) -> bytes:
+    """Payload JSON de src/transport/frame.py (mismas filas que el binario, para depuración)."""
+    return encode_frame_json(FrameRow(device, timestamp, values) for timestamp, values in samples)
+
+
+PAYLOAD_ENCODERS: Dict[str, PayloadEncoder] = {"json": encode_json, "frame": encode_binary}
+
+
+@dataclass
+class MqttSettings:
+    """Parámetros de la sección [MQTT] de config.ini."""
+    host: str = "mqtt"
+    port: int = 1883
+    client_id: str = "gateway_ems"
+    username: Optional[str] = None
+    password: Optional[str] = None
+    keepalive: int = 60
+    topic_prefix: str = "ems/readings"
+    qos: int = 1
+    max_queue: int = 1000
+    policy: QueuePolicy = QueuePolicy.DROP_OLDEST
+    block_timeout: float = 1.0
+    batch_size: int = 10
+    flush_interval: float = 5.0
+    max_inflight: int = 20
+    ack_timeout: float = 30.0
+    payload_format: str = "json"
+
+    @classmethod
+    def from_config(cls) -> "MqttSettings":
+        section = "MQTT"
+        config = configManager.config
+        qos = config.getint(section, "qos", fallback=1)
+        if qos not in (0, 1, 2):
+            raise ValueError(f"QoS MQTT inválido: {qos}")
+        payload_format = config.get(section, "payload_format", fallback="json")
+        if payload_format not in PAYLOAD_ENCODERS:
+            raise ValueError(f"Formato de payload MQTT inválido: {payload_format}")
+        return cls(
+            host=config.get(section, "host", fallback="mqtt"),
+            port=config.getint(section, "port", fallback=1883),
+            client_id=config.get(section, "client_id", fallback="gateway_ems"),
+            username=config.get(section, "username", fallback=None) or None,
+            password=config.get(section, "password", fallback=None) or None,
+            keepalive=config.getint(section, "keepalive", fallback=60),
+            topic_prefix=config.get(section, "topic_prefix", fallback="ems/readings"),
+            qos=qos,
+            max_queue=config.getint(section, "max_queue", fallback=1000),
+            policy=QueuePolicy(config.get(section, "queue_policy", fallback="drop_oldest")),
+            block_timeout=config.getfloat(section, "block_timeout", fallback=1.0),
+            batch_size=config.getint(section, "batch_size", fallback=10),
+            flush_interval=config.getfloat(section, "flush_interval", fallback=5.0),
+            max_inflight=config.getint(section, "max_inflight", fallback=20),
+            ack_timeout=config.getfloat(section, "ack_timeout", fallback=30.0),
+            payload_format=payload_format,
+        )
+
+
+@dataclass
+class PublisherStats:
+    """Métricas del publicador"""
+    enqueued: int = 0
+    dropped: int = 0
+    messages: int = 0
+    acked: int = 0
+    failed: int = 0
+    bytes_sent: int = 0
+    spooled: int = 0
+    max_queue_depth: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW), repr=False)
+
+    def latency_ms(self) -> Dict[str, Optional[float]]:
+        if not self.latencies:
+            return {"p50": None, "p95": None, "max": None}
+        ordered = sorted(self.latencies)
+        last = len(ordered) - 1
+        return {
+            "p50": round(ordered[last // 2] * 1000, 3),
+            "p95": round(ordered[int(last * 0.95)] * 1000, 3),
+            "max": round(ordered[last] * 1000, 3),
+        }
+
+    def as_dict(self, queue_depth: int = 0) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "messages": self.messages,
+            "acked": self.acked,
+            "failed": self.failed,
+            "bytes_sent": self.bytes_sent,
+            "spooled": self.spooled,
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "publish_latency_ms": self.latency_ms(),
+        }
+
+
+class MqttPublisher:
+    """
+    Publicador MQTT asíncrono de las lecturas del gateway.
+
+    Cada ciclo de sondeo de un dispositivo entra en una cola acotada; un worker
+    agrupa los ciclos por topic (`<topic_prefix>/<dispositivo>`) y publica un
+    mensaje cada `batch_size` ciclos o cada `flush_interval` segundos, lo que
+    ocurra antes. Con la cola llena se aplica `policy`. La red la gestiona el
+    hilo de paho (loop_start); mientras no hay conexión el worker espera y la
+    cola absorbe las lecturas.
+
+    Con un `spool`, los mensajes que no se pueden publicar se guardan en disco
+    y, al reconectar, se reenvían en orden (QoS >= 1) en una tarea aparte; el
+    spool solo los borra cuando el broker los ha confirmado.
+    """
+
+    def __init__(self, settings: Optional[MqttSettings] = None, encoder: Optional[PayloadEncoder] = None, spool: Optional[DiskSpool] = None):
+        self.settings = settings or MqttSettings.from_config()
+        self.encoder = encoder or PAYLOAD_ENCODERS[self.settings.payload_format]
+        self.spool = spool
+        self.stats = PublisherStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._batches: Dict[str, List[CycleSample]] = {}
+        self._batch_started: Dict[str, float] = {}
+        self._pending: Dict[int, float] = {}
+        self._replay_acks: Dict[int, asyncio.Future] = {}
+        self._early_acks: Set[int] = set()
+        self._pending_lock = threading.RLock()
+        self._connected: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._replay: Optional[asyncio.Task] = None
+        self._client: Optional[mqtt.Client] = None
+
+    @classmethod
+    def from_config(cls) -> "MqttPublisher":
+        """Publicador con [MQTT] y, si `[SPOOL] enabled`, con spool en disco."""
+        spool = DiskSpool.from_config() if configManager.config.getboolean("SPOOL", "enabled", fallback=False) else None
+        return cls(MqttSettings.from_config(), spool=spool)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected is not None and self._connected.is_set()
+
+    async def start(self) -> None:
+        """Conecta con el broker (en segundo plano) y arranca el worker de publicación."""
+        if self._worker is not None:
+            return
+        s = self.settings
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=s.max_queue)
+        self._connected = asyncio.Event()
+
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=s.client_id)
+        if s.username:
+            client.username_pw_set(s.username, s.password)
+        client.max_inflight_messages_set(s.max_inflight)
+        client.reconnect_delay_set(min_delay=1, max_delay=60)
+        client.on_connect = self.__on_connect
+        client.on_disconnect = self.__on_disconnect
+        client.on_publish = self.__on_publish
+        self._client = client
+
+        client.connect_async(s.host, s.port, keepalive=s.keepalive)
+        client.loop_start()
+        self._worker = asyncio.create_task(self.__run())
+        logger.info(f"📡 Publicador MQTT iniciado hacia {s.host}:{s.port} (QoS {s.qos}, cola {s.max_queue}, {s.policy})")
+
+    async def stop(self, flush_timeout: float = 5.0) -> None:
+        """Publica lo pendiente (o lo guarda en el spool si no hay conexión) y cierra el cliente y el spool."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._replay is not None:
+            replay = self._replay
+            replay.cancel()
+            try:
+                await replay
+            except asyncio.CancelledError:
+                pass
+            self._replay = None
+
+        if self.connected or self.spool is not None:
+            self.__drain_queue()
+            for topic in list(self._batches):
+                self.__flush(topic)
+            deadline = time.monotonic() + flush_timeout
+            while self._pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        elif self.queue_depth or self._batches:
+            logger.warning(f"⚠️ Publicador MQTT detenido sin conexión: se descartan {self.queue_depth} ciclos en cola")
+
+        self._client.disconnect()
+        self._client.loop_stop()
+        if self.spool is not None:
+            # Cierra el segmento abierto con fsync; el último ack ya está en disco
+            self.spool.close()
+        logger.info(f"📡 Publicador MQTT detenido: {self.get_stats()}")
+
+    async def publish_cycle(self, device: str, values: Dict[str, float], timestamp: Optional[float] = None) -> bool:
+        """
+        Encola las lecturas de un dispositivo en un ciclo.
+
+        :return: False si la muestra se descartó por la política de la cola.
+        """
+        if self._queue is None:
+            raise RuntimeError("El publicador MQTT no está iniciado")
+        item = (device, (time.time() if timestamp is None else timestamp, values))
+        queue = self._queue
+        policy = self.settings.policy
+
+        if queue.full():
+            if policy == QueuePolicy.DROP_NEWEST:
+                self.stats.dropped += 1
+                return False
+            if policy == QueuePolicy.DROP_OLDEST:
+                queue.get_nowait()
+                self.stats.dropped += 1
+            else:
+                try:
+                    await asyncio.wait_for(queue.put(item), self.settings.block_timeout)
+                except asyncio.TimeoutError:
+                    self.stats.dropped += 1
+                    return False
+                self.__count_enqueued()
+                return True
+
+        queue.put_nowait(item)
+        self.__count_enqueued()
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            data = self.stats.as_dict(self.queue_depth)
+            data["pending_acks"] = len(self._pending)
+        data["connected"] = self.connected
+        if self.spool is not None:
+            data["spool"] = self.spool.as_dict()
+        return data
+
+    def topic(self, device: str) -> str:
+        return f"{self.settings.topic_prefix}/{device}"
+
+    def __count_enqueued(self) -> None:
+        self.stats.enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+
+    async def __run(self) -> None:
+        queue = self._queue
+        while True:
+            # Sin conexión y sin spool no se saca nada de la cola: paho encolaría sin límite
+            if self.spool is None:
+                await self._connected.wait()
+            timeout = self.__next_flush_in()
+            try:
+                device, sample = await asyncio.wait_for(queue.get(), timeout)
+                self.__add(device, sample)
+                # Vaciar lo que ya esté en cola sin volver a esperar
+                self.__drain_queue()
+            except asyncio.TimeoutError:
+                pass
+            self.__flush_due()
+            # Reintenta el reenvío si un replay anterior se cortó sin perder la conexión
+            self.__start_replay()
+
+    def __drain_queue(self) -> None:
+        queue = self._queue
+        while not queue.empty():
+            device, sample = queue.get_nowait()
+            self.__add(device, sample)
+
+    def __add(self, device: str, sample: CycleSample) -> None:
+        topic = self.topic(device)
+        batch = self._batches.get(topic)
+        if batch is None:
+            batch = self._batches[topic] = []
+            self._batch_started[topic] = time.monotonic()
+        batch.append(sample)
+        if len(batch) >= self.settings.batch_size:
+            self.__flush(topic)
+
+    def __next_flush_in(self) -> Optional[float]:
+        if not self._batch_started:
+            return None
+        oldest = min(self._batch_started.values())
+        return max(0.0, oldest + self.settings.flush_interval - time.monotonic())
+
+    def __flush_due(self) -> None:
+        now = time.monotonic()
+        interval = self.settings.flush_interval
+        for topic, started in list(self._batch_started.items()):
+            if now - started >= interval:
+                self.__flush(topic)
+
+    def __flush(self, topic: str) -> None:
+        samples = self._batches.pop(topic, None)
+        self._batch_started.pop(topic, None)
+        if not samples:
+            return
+        device = topic[len(self.settings.topic_prefix) + 1:]
+        payload = self.encoder(device, samples)
+        # Mientras haya atrasos en el spool lo nuevo va detrás para mantener el orden
+        if self.spool is not None and (not self.connected or self._replay is not None):
+            self.__to_spool(topic, payload)
+            return
+        info = self.__publish(topic, payload, self.settings.qos)
+        if info is None and self.spool is not None:
+            self.__to_spool(topic, payload)
+
+    def __publish(self, topic: str, payload: bytes, qos: int, ack: Optional[asyncio.Future] = None) -> Optional[mqtt.MQTTMessageInfo]:
+        with self._pending_lock:
+            info = self._client.publish(topic, payload, qos=qos)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self.stats.failed += 1
+                logger.warning(f"⚠️ No se pudo publicar en {topic}: {mqtt.error_string(info.rc)}")
+                return None
+            if info.mid in self._early_acks:
+                # paho ya llamó a on_publish dentro de publish()
+                self._early_acks.discard(info.mid)
+                self.stats.acked += 1
+                if ack is not None:
+                    ack.set_result(True)
+            else:
+                self._pending[info.mid] = time.monotonic()
+                if ack is not None:
+                    self._replay_acks[info.mid] = ack
+        self.stats.messages += 1
+        self.stats.bytes_sent += len(payload)
+        return info
+
+    def __to_spool(self, topic: str, payload: bytes) -> None:
+        encoded = topic.encode()
+        self.spool.append(SPOOLED_TOPIC.pack(len(encoded)) + encoded + payload)
+        self.stats.spooled += 1
+
+    async def __replay_spool(self) -> None:
+        try:
+            # Se repite hasta vaciar: lo que llega al spool durante el replay también se reenvía
+            while self.connected and self.spool.pending:
+                if not await self.spool.replay(self.__send_spooled):
+                    break
+        finally:
+            self._replay = None
+            if self.connected and self.spool.pending == 0:
+                logger.info("💾 Spool MQTT al día")
+
+    async def __send_spooled(self, records: List[SpoolRecord]) -> bool:
+        if not self.connected:
+            return False
+        # QoS >= 1: sin confirmación del broker no se puede borrar del spool
+        qos = max(1, self.settings.qos)
+        acks = []
+        for _, record in records:
+            (length,) = SPOOLED_TOPIC.unpack_from(record)
+            topic = record[SPOOLED_TOPIC.size:SPOOLED_TOPIC.size + length].decode()
+            ack = self._loop.create_future()
+            if self.__publish(topic, record[SPOOLED_TOPIC.size + length:], qos, ack) is None:
+                return False
+            acks.append(ack)
+        try:
+            await asyncio.wait_for(asyncio.gather(*acks), self.settings.ack_timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Sin confirmación del broker para {len(acks)} mensajes del spool")
+            return False
+
+    # Callbacks de paho: se ejecutan en su hilo de red
+
+    def __on_connect(self, client, userdata, flags, reason_code, properties) -> None:
+        if reason_code.is_failure:
+            logger.error(f"❌ Conexión MQTT rechazada: {reason_code}")
+            return
+        logger.info(f"✅ Conectado al broker MQTT {self.settings.host}:{self.settings.port}")
+        self._loop.call_soon_threadsafe(self.__link_up)
+
+    def __link_up(self) -> None:
+        self._connected.set()
+        self.__start_replay()
+
+    def __start_replay(self) -> None:
+        if self.spool is not None and self.connected and self.spool.pending and self._replay is None:
+            self._replay = asyncio.create_task(self.__replay_spool())
+
+    def __on_disconnect(self, client, userdata, flags, reason_code, properties) -> None:
+        logger.warning(f"🔌 Desconectado del broker MQTT: {reason_code}")
+        self._loop.call_soon_threadsafe(self._connected.clear)
+
+    def __on_publish(self, client, userdata, mid, reason_code, properties) -> None:
+        # QoS 0: mensaje escrito en el socket; QoS 1/2: confirmado por el broker
+        # acked y latencies se comparten con el bucle de eventos: siempre bajo el lock
+        with self._pending_lock:
+            sent_at = self._pending.pop(mid, None)
+            if sent_at is None:
+                self._early_acks.add(mid)
+                return
+            ack = self._replay_acks.pop(mid, None)
+            self.stats.acked += 1
+            self.stats.latencies.append(time.monotonic() - sent_at)
+        if ack is not None:
+            self._loop.call_soon_threadsafe(self.__resolve, ack)
+
+    @staticmethod
+    def __resolve(ack: asyncio.Future) -> None:
+        if not ack.done():
+            ack.set_result(True)
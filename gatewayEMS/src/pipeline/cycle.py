@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from src.core.ringbuffer import RingBufferStore
+from src.core.scheduler import PollScheduler, group_by_interval
+from src.modbus.decoder import DecodeLayout, decode_cycle
+from src.modbus.plan_cache import device_map_compiler
+from src.modbus.planner import ReadPlan
+from src.modbus.read import read_registers
+from src.mqtt.publisher import MqttPublisher
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PollTarget:
+    """Canales de un dispositivo que se leen con un mismo intervalo."""
+    client_key: str
+    device: Dict[str, Any]
+    plan: ReadPlan
+    layout: DecodeLayout
+
+    @property
+    def name(self) -> str:
+        return self.device["name"]
+
+
+class PollPipeline:
+    """
+    Ciclo de sondeo del gateway: lectura Modbus → decodificación → banda
+    muerta → ring buffer → publicador MQTT. El ring buffer guarda el ciclo
+    decodificado completo (historia local reciente, canales `dispositivo/canal`);
+    al publicador solo llega lo que pasa la banda muerta.
+
+    Los canales se agrupan por su intervalo (clave `interval` por entrada o del
+    mapa, o la del dispositivo en su sección) y se registra un trabajo del
+    PollScheduler por intervalo distinto que solo lee sus canales, p. ej.
+    potencia cada 0.25 s y energía cada 60 s del mismo medidor.
+    """
+
+    def __init__(self, pool: Any, clients: Dict[str, Dict[str, Any]], default_interval: float = 1.0,
+                 publisher: Optional[MqttPublisher] = None, ring_buffer: Optional[RingBufferStore] = None):
+        self.pool = pool
+        self.clients = clients
+        self.default_interval = float(default_interval)
+        self.publisher = publisher
+        self.ring_buffer = ring_buffer
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.targets = self.__build_targets()
+
+    def register(self, scheduler: PollScheduler) -> None:
+        """Un trabajo por intervalo, con los primeros plazos repartidos en el intervalo más corto."""
+        intervals = sorted(self.targets)
+        if not intervals:
+            logger.warning("Sin dispositivos que sondear")
+            return
+        spread = intervals[0] / len(intervals)
+        for i, interval in enumerate(intervals):
+            targets = self.targets[interval]
+            scheduler.add_job(f"modbus_read_{interval:g}s", interval, lambda targets=targets: self.read_cycle(targets), offset=i * spread)
+            logger.info(f"Trabajo de {interval:g}s: {sorted({target.name for target in targets})}")
+
+    async def read_cycle(self, targets: List[PollTarget]) -> Dict[str, Dict[str, float]]:
+        """Lee, decodifica, filtra y publica un ciclo de los `targets`; devuelve lo decodificado."""
+        by_client: Dict[str, List[PollTarget]] = defaultdict(list)
+        for target in targets:
+            by_client[target.client_key].append(target)
+        results = await asyncio.gather(*(self.__read_client(key, group) for key, group in by_client.items()), return_exceptions=True)
+
+        readings: List[Tuple[str, DecodeLayout, List[Optional[int]]]] = []
+        for client_key, result in zip(by_client, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error leyendo {client_key}: {result}")
+                continue
+            readings.extend((target.name, target.layout, registers) for target, registers in result)
+
+        timestamp = time.time()
+        now = time.monotonic()
+        decoded = decode_cycle(readings)
+        for device, values in decoded.items():
+            report = self.devices[device]["deadband"].filter(values, now)
+            if self.ring_buffer is not None:
+                self.ring_buffer.append_many(values, now, prefix=f"{device}/")
+            if report and self.publisher is not None:
+                await self.publisher.publish_cycle(device, report, timestamp)
+        return decoded
+
+    async def __read_client(self, client_key: str, targets: List[PollTarget]) -> List[Tuple[PollTarget, List[Optional[int]]]]:
+        if not await self.pool.ensure_connected(client_key):
+            return []
+        info = self.clients[client_key]
+
+        async def read(target: PollTarget) -> Optional[List[Optional[int]]]:
+            slave = int(target.device["slave"])
+            result = await read_registers(
+                info["client"], slave, target.layout.addresses, target.layout.counts,
+                function_code=int(target.device.get("modbus_function") or 3),
+                scheduler=info.get("scheduler"),
+                plan=target.plan,
+                breakers=info.get("breakers"),
+            )
+            return result.get(slave)
+
+        registers = await asyncio.gather(*(read(target) for target in targets))
+        return [(target, data) for target, data in zip(targets, registers) if data is not None]
+
+    def __build_targets(self) -> Dict[float, List[PollTarget]]:
+        targets: Dict[float, List[PollTarget]] = defaultdict(list)
+        for client_key, info in self.clients.items():
+            for device in info["devices"]:
+                self.devices[device["name"]] = device
+                compiled = device["compiled_map"]
+                groups = group_by_interval(compiled.device_map, float(device.get("interval") or self.default_interval))
+                for interval, sub_map in groups.items():
+                    if len(groups) > 1:
+                        # Cada intervalo con su propio plan: solo se piden sus registros
+                        compiled = device_map_compiler.compile_map(sub_map, device["max_gap"], device["max_block_size"])
+                    targets[interval].append(PollTarget(client_key, device, compiled.plan, compiled.layout))
+        return dict(targets)
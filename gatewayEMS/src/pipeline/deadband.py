@@ -0,0 +1,176 @@
+import math
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.config.config import configManager
+from src.modbus.decoder import DecodeLayout
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class DeadbandRule:
+    """
+    Regla de reporte por excepción de un canal.
+
+    Un valor se reporta si difiere del último enviado más que
+    max(`absolute`, `percent`% del último valor), nunca antes de `min_interval`
+    segundos desde el último envío y siempre pasados `max_interval` segundos
+    (0 = sin límite).
+    """
+    absolute: float = 0.0
+    percent: float = 0.0
+    min_interval: float = 0.0
+    max_interval: float = 0.0
+
+    @classmethod
+    def from_config(cls) -> "DeadbandRule":
+        """Valores por defecto de la sección [DEADBAND] de config.ini."""
+        section = "DEADBAND"
+        config = configManager.config
+        return cls(
+            absolute=config.getfloat(section, "deadband", fallback=0.0),
+            percent=config.getfloat(section, "deadband_pct", fallback=0.0),
+            min_interval=config.getfloat(section, "min_interval", fallback=0.0),
+            max_interval=config.getfloat(section, "max_interval", fallback=0.0),
+        )
+
+    def override(self, entry: Dict[str, Any]) -> "DeadbandRule":
+        """Aplica las claves deadband/deadband_pct/min_interval/max_interval de una entrada del mapa."""
+        return DeadbandRule(
+            absolute=float(entry.get("deadband", self.absolute)),
+            percent=float(entry.get("deadband_pct", self.percent)),
+            min_interval=float(entry.get("min_interval", self.min_interval)),
+            max_interval=float(entry.get("max_interval", self.max_interval)),
+        )
+
+
+@dataclass
+class DeadbandFilter:
+    """
+    Etapa de filtrado entre la decodificación y los sinks de un dispositivo.
+
+    El estado (último valor y instante enviados) y las reglas viven en `array`
+    paralelos indexados como `DecodeLayout.fields`, de modo que filtrar un ciclo
+    es un recorrido sobre floats sin diccionarios intermedios. Cada `heartbeat`
+    segundos (0 = desactivado) se reportan todos los canales a la vez.
+    """
+    names: List[str]
+    rules: List[DeadbandRule]
+    heartbeat: float = 0.0
+    seen: int = 0
+    reported: int = 0
+    _last_value: array = field(init=False, repr=False)
+    _last_sent: array = field(init=False, repr=False)
+    _absolute: array = field(init=False, repr=False)
+    _fraction: array = field(init=False, repr=False)
+    _min_interval: array = field(init=False, repr=False)
+    _max_interval: array = field(init=False, repr=False)
+    _next_heartbeat: float = field(init=False, default=0.0, repr=False)
+    _index: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if len(self.names) != len(self.rules):
+            raise ValueError("Se necesita una regla por canal")
+        n = len(self.names)
+        self._last_value = array("d", [math.nan] * n)
+        # -inf: el primer valor de cada canal siempre se reporta
+        self._last_sent = array("d", [-math.inf] * n)
+        self._absolute = array("d", (r.absolute for r in self.rules))
+        self._fraction = array("d", (r.percent / 100 for r in self.rules))
+        self._min_interval = array("d", (r.min_interval for r in self.rules))
+        self._max_interval = array("d", (r.max_interval if r.max_interval > 0 else math.inf for r in self.rules))
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def for_layout(
+        cls,
+        layout: DecodeLayout,
+        device_map: Dict[str, Any],
+        defaults: Optional[DeadbandRule] = None,
+        heartbeat: Optional[float] = None,
+    ) -> "DeadbandFilter":
+        """
+        Crea el filtro de un dispositivo. Las reglas por canal salen de las
+        entradas del mapa; lo no indicado toma los valores de [DEADBAND].
+        """
+        defaults = defaults or DeadbandRule.from_config()
+        if heartbeat is None:
+            heartbeat = configManager.config.getfloat("DEADBAND", "heartbeat", fallback=0.0)
+        names = [spec.name for spec in layout.fields]
+        rules = [defaults.override(device_map.get(name) or {}) for name in names]
+        return cls(names=names, rules=rules, heartbeat=heartbeat)
+
+    def filter_values(self, values: Sequence[float], now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Filtra un ciclo decodificado con `DecodeLayout.decode_values`.
+
+        :return: {canal: valor} solo con los canales a reportar.
+        """
+        if len(values) != len(self.names):
+            raise ValueError(f"Se esperaban {len(self.names)} valores y se recibieron {len(values)}")
+        return self.__evaluate(enumerate(values), len(values), now)
+
+    def filter(self, values: Dict[str, float], now: Optional[float] = None) -> Dict[str, float]:
+        """Igual que filter_values pero a partir de {canal: valor}; los canales desconocidos se ignoran."""
+        index = self._index
+        items = [(index[name], value) for name, value in values.items() if name in index]
+        return self.__evaluate(items, len(items), now)
+
+    def __evaluate(self, items: Iterable[Tuple[int, float]], count: int, now: Optional[float]) -> Dict[str, float]:
+        now = time.monotonic() if now is None else now
+        names = self.names
+        last_value = self._last_value
+        last_sent = self._last_sent
+        self.seen += count
+
+        if self.heartbeat > 0 and now >= self._next_heartbeat:
+            self._next_heartbeat = now + self.heartbeat
+            report = {}
+            for i, value in items:
+                last_value[i] = value
+                last_sent[i] = now
+                report[names[i]] = value
+            self.reported += len(report)
+            return report
+
+        absolute = self._absolute
+        fraction = self._fraction
+        min_interval = self._min_interval
+        max_interval = self._max_interval
+        report = {}
+        for i, value in items:
+            elapsed = now - last_sent[i]
+            if elapsed < min_interval[i]:
+                continue
+            previous = last_value[i]
+            if elapsed < max_interval[i]:
+                if value != value or previous != previous:
+                    # NaN: solo se reporta la transición desde/hacia un valor válido
+                    if (value != value) == (previous != previous):
+                        continue
+                elif abs(value - previous) <= max(absolute[i], fraction[i] * abs(previous)):
+                    continue
+            last_value[i] = value
+            last_sent[i] = now
+            report[names[i]] = value
+
+        self.reported += len(report)
+        return report
+
+    def reset(self) -> None:
+        """Olvida lo enviado: el siguiente ciclo se reporta completo (p.ej. tras reconectar el sink)."""
+        for i in range(len(self.names)):
+            self._last_value[i] = math.nan
+            self._last_sent[i] = -math.inf
+        self._next_heartbeat = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self.names),
+            "seen": self.seen,
+            "reported": self.reported,
+            "reduction": round(1 - self.reported / self.seen, 4) if self.seen else 0.0,
+        }
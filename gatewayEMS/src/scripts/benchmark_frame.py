@@ -0,0 +1,92 @@
+"""
+Benchmark del formato de tramas: bytes por muestra y muestras/s al codificar
+y decodificar, binario frente a JSON.
+
+Las filas se generan a partir de un mapa de registros real (un ciclo por
+dispositivo y segundo), igual que las que publica el gateway.
+
+Uso:
+    uv run -m src.scripts.benchmark_frame --devices 1 10 --cycles 10 --output frame.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from src.modbus.decoder import DecodeLayout
+from src.transport.frame import FrameRow, decode_frame, decode_json, encode_frame, encode_json
+
+DEFAULT_MAP = "src/modbus/map/Modbus_DTSU666.json"
+
+
+def build_rows(names: List[str], devices: int, cycles: int, seed: int = 0) -> List[FrameRow]:
+    rng = random.Random(seed)
+    start = time.time()
+    return [
+        FrameRow(f"DEVICE_{device}", start + cycle, {name: rng.uniform(0, 500) for name in names})
+        for cycle in range(cycles)
+        for device in range(devices)
+    ]
+
+
+def throughput(func: Callable[[], Any], samples: int, min_seconds: float) -> float:
+    """Muestras por segundo repitiendo `func` durante al menos `min_seconds`."""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return round(runs * samples / elapsed, 1)
+
+
+def measure(rows: List[FrameRow], min_seconds: float) -> Dict[str, Any]:
+    samples = sum(len(row.values) for row in rows)
+    binary = encode_frame(rows)
+    text = encode_json(rows)
+    result = {"rows": len(rows), "samples": samples}
+    for name, payload, encode, decode in (
+        ("frame", binary, lambda: encode_frame(rows), lambda: decode_frame(binary)),
+        ("json", text, lambda: encode_json(rows), lambda: decode_json(text)),
+    ):
+        result[name] = {
+            "bytes": len(payload),
+            "bytes_per_sample": round(len(payload) / samples, 2),
+            # Referencia si el enlace comprime (p.ej. deflate a nivel de transporte)
+            "deflate_bytes_per_sample": round(len(zlib.compress(payload)) / samples, 2),
+            "encode_samples_per_second": throughput(encode, samples, min_seconds),
+            "decode_samples_per_second": throughput(decode, samples, min_seconds),
+        }
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark del formato binario de tramas")
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--cycles", type=int, default=10, help="Ciclos de sondeo por trama")
+    parser.add_argument("--min-seconds", type=float, default=1.0)
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with open(args.map, "r") as file:
+        names = [spec.name for spec in DecodeLayout.compile(json.load(file)).fields]
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "parameters": {"map": args.map, "channels": len(names), "cycles": args.cycles},
+        "results": [measure(build_rows(names, devices, args.cycles), args.min_seconds) for devices in args.devices],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
@@ -0,0 +1,197 @@
+"""
+Benchmark extremo a extremo del sondeo Modbus contra el simulador.
+
+Para cada número de dispositivos arranca el simulador en un proceso aparte,
+conecta con ModbusClientFactory.start_connection, sondea con read_registers
+durante `--duration` segundos y escribe un JSON con sondeos por segundo,
+latencias p50/p95/p99 y CPU/memoria del proceso del gateway.
+
+Uso:
+    uv run -m src.scripts.benchmark_polling --devices 10 50 200 --duration 20 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from src.Model.model import NameParamsModbus, ProtocolCom
+from src.modbus.decoder import DecodeLayout
+from src.modbus.modbus import ModbusClientFactory
+from src.modbus.planner import DEFAULT_MAX_GAP
+from src.modbus.read import read_registers
+from src.scripts.modbus_simulator import DEFAULT_MAP, FaultProfile, ModbusSimulator, run_forever
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max en milisegundos."""
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value, "max": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49] * 1000, 3),
+        "p95": round(cuts[94] * 1000, 3),
+        "p99": round(cuts[98] * 1000, 3),
+        "max": round(max(samples) * 1000, 3),
+    }
+
+
+def build_config(simulator: ModbusSimulator) -> Dict[str, Dict[str, Any]]:
+    """Configuración de dispositivos equivalente a la de config.ini para los esclavos simulados."""
+    return {
+        name: {
+            NameParamsModbus.protocol: ProtocolCom.TCP,
+            NameParamsModbus.host: device["host"],
+            NameParamsModbus.port: device["port"],
+            NameParamsModbus.slave_id: device["slave"],
+            NameParamsModbus.modbus_function: 3,
+        }
+        for name, device in simulator.device_config().items()
+    }
+
+
+async def poll_client(client_info: Dict[str, Any], layout: DecodeLayout, max_gap: int, deadline: float, latencies: List[float], counters: Dict[str, int]) -> None:
+    """Sondea todos los esclavos de un cliente en bucle hasta `deadline`."""
+    slaves = [device["slave"] for device in client_info["devices"]]
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            result = await read_registers(
+                client_info["client"], slaves, layout.addresses, layout.counts,
+                max_gap=max_gap, scheduler=client_info.get("scheduler"), breakers=client_info.get("breakers"),
+            )
+        except Exception as e:
+            counters["errors"] += len(slaves)
+            logger.error(f"Error de sondeo: {e}")
+            await asyncio.sleep(0.1)
+            continue
+        latencies.append(time.monotonic() - start)
+        for registers in result.values():
+            if len(registers) == layout.buffer_size:
+                layout.decode(registers)
+                counters["polls"] += 1
+            else:
+                counters["errors"] += 1
+        counters["errors"] += len(slaves) - len(result)
+
+
+async def run_case(simulator: ModbusSimulator, layout: DecodeLayout, duration: float, max_gap: int) -> Dict[str, Any]:
+    factory = ModbusClientFactory(build_config(simulator))
+    connect_start = time.monotonic()
+    clients = await factory.start_connection()
+    connect_time = time.monotonic() - connect_start
+
+    latencies: List[float] = []
+    counters = {"polls": 0, "errors": 0}
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    deadline = wall_start + duration
+    try:
+        await asyncio.gather(*(
+            poll_client(client_info, layout, max_gap, deadline, latencies, counters)
+            for client_info in clients.values()
+        ))
+    finally:
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        await factory.close_all()
+
+    devices = simulator.servers * simulator.slaves
+    return {
+        "devices": devices,
+        "clients": len(clients),
+        "connect_seconds": round(connect_time, 3),
+        "polls": counters["polls"],
+        "errors": counters["errors"],
+        "polls_per_second": round(counters["polls"] / wall, 2) if wall else 0.0,
+        "cycle_latency_ms": percentiles(latencies),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+        "cpu_ms_per_poll": round(1000 * cpu / counters["polls"], 4) if counters["polls"] else None,
+        # ru_maxrss está en KiB en Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "connection_stats": factory.get_stats(),
+        "breakers": factory.get_breaker_states(),
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    with open(args.map, "r") as file:
+        layout = DecodeLayout.compile(json.load(file))
+
+    profile = FaultProfile(
+        latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000),
+        error_rate=args.error_rate,
+        dropout_rate=args.dropout_rate,
+    )
+    results = []
+    for devices in args.devices:
+        servers = max(1, min(args.servers, devices))
+        simulator = ModbusSimulator(
+            servers=servers,
+            slaves=max(1, devices // servers),
+            port=args.port,
+            map_path=args.map,
+            profile=profile,
+        )
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=run_forever, args=(simulator, ready), daemon=True)
+        process.start()
+        try:
+            if not ready.wait(timeout=30):
+                raise RuntimeError("El simulador no arrancó a tiempo")
+            result = asyncio.run(run_case(simulator, layout, args.duration, args.max_gap))
+            logger.info(f"{devices} dispositivos: {result['polls_per_second']} sondeos/s, p99 {result['cycle_latency_ms']['p99']} ms")
+            results.append(result)
+        finally:
+            process.terminate()
+            process.join(timeout=10)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "parameters": {
+            "duration": args.duration,
+            "map": args.map,
+            "servers": args.servers,
+            "max_gap": args.max_gap,
+            "latency_ms": list(args.latency_ms),
+            "error_rate": args.error_rate,
+            "dropout_rate": args.dropout_rate,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de sondeo Modbus del Gateway EMS")
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--servers", type=int, default=4, help="Hosts simulados entre los que se reparten los dispositivos")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    parser.add_argument("--max-gap", type=int, default=DEFAULT_MAX_GAP)
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(1.0, 5.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--dropout-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
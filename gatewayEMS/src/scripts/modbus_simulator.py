@@ -0,0 +1,164 @@
+"""
+Simulador Modbus TCP para pruebas de carga sin medidores físicos.
+
+Levanta uno o varios servidores pymodbus (uno por dirección de loopback
+127.0.0.x, de modo que ModbusClientFactory cree un cliente por "host") con
+cientos de esclavos que sirven el mismo mapa de registros, y permite inyectar
+latencia de respuesta, errores Modbus y caídas (peticiones sin respuesta).
+
+Uso:
+    uv run -m src.scripts.modbus_simulator --servers 4 --slaves 50 --latency-ms 5 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from pymodbus.constants import ExcCodes
+from pymodbus.datastore import ModbusDeviceContext, ModbusSequentialDataBlock, ModbusServerContext
+from pymodbus.server import ModbusTcpServer
+from src.modbus.decoder import FieldSpec
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAP = "src/modbus/map/Modbus_DTSU666.json"
+
+
+def build_register_image(map_path: str, seed: int = 0) -> List[int]:
+    """
+    Genera el espacio de 65536 registros con valores plausibles para cada campo
+    del mapa (big-endian, como los lee DecodeLayout).
+    """
+    rng = random.Random(seed)
+    with open(map_path, "r") as file:
+        device_map = json.load(file)
+
+    registers = [0] * 65536
+    for name, entry in device_map.items():
+        if not isinstance(entry, dict):
+            continue
+        spec = FieldSpec.from_map_entry(name, entry)
+        if spec.fmt in ("f", "d"):
+            value = rng.uniform(0, 500)
+        else:
+            value = rng.randint(0, 1000)
+        words = struct.unpack(f">{spec.registers}H", struct.pack(f">{spec.fmt}", value))
+        registers[spec.address:spec.address + spec.registers] = words
+    return registers
+
+
+@dataclass
+class FaultProfile:
+    """Comportamiento anómalo inyectado en cada petición."""
+    latency: Tuple[float, float] = (0.0, 0.0)
+    error_rate: float = 0.0
+    dropout_rate: float = 0.0
+    dropout_seconds: float = 10.0
+
+
+class SimulatedDevice(ModbusDeviceContext):
+    """Esclavo simulado que comparte bloques de datos y aplica el perfil de fallos."""
+
+    def __init__(self, block: ModbusSequentialDataBlock, profile: FaultProfile):
+        super().__init__(di=block, co=block, ir=block, hr=block)
+        self.profile = profile
+
+    async def async_getValues(self, func_code: int, address: int, count: int = 1):
+        profile = self.profile
+        if profile.dropout_rate and random.random() < profile.dropout_rate:
+            # Sin respuesta dentro del timeout del cliente
+            await asyncio.sleep(profile.dropout_seconds)
+        low, high = profile.latency
+        if high > 0:
+            await asyncio.sleep(random.uniform(low, high))
+        if profile.error_rate and random.random() < profile.error_rate:
+            return ExcCodes.DEVICE_FAILURE
+        return self.getValues(func_code, address, count)
+
+
+@dataclass
+class ModbusSimulator:
+    """
+    Conjunto de servidores simulados.
+
+    :param servers: Número de servidores (hosts 127.0.0.2, 127.0.0.3, ...).
+    :param slaves: Esclavos por servidor (ids 1..slaves).
+    """
+    servers: int = 1
+    slaves: int = 10
+    port: int = 5020
+    map_path: str = DEFAULT_MAP
+    profile: FaultProfile = field(default_factory=FaultProfile)
+    _servers: List[ModbusTcpServer] = field(init=False, default_factory=list, repr=False)
+
+    @property
+    def endpoints(self) -> List[Tuple[str, int]]:
+        return [(f"127.0.0.{i + 2}", self.port) for i in range(self.servers)]
+
+    def device_config(self) -> Dict[str, Dict[str, object]]:
+        """Dispositivos simulados como (host, port, slave) para construir la configuración."""
+        devices = {}
+        for host, port in self.endpoints:
+            for slave in range(1, self.slaves + 1):
+                devices[f"SIM_{host}_{slave}"] = {"host": host, "port": port, "slave": slave}
+        return devices
+
+    async def start(self) -> None:
+        # Un único bloque de registros compartido: los esclavos sirven la misma imagen
+        block = ModbusSequentialDataBlock(1, build_register_image(self.map_path))
+        for host, port in self.endpoints:
+            devices = {slave: SimulatedDevice(block, self.profile) for slave in range(1, self.slaves + 1)}
+            context = ModbusServerContext(devices=devices, single=False)
+            server = ModbusTcpServer(context, address=(host, port))
+            await server.serve_forever(background=True)
+            self._servers.append(server)
+        logger.info(f"Simulador Modbus: {self.servers} servidor(es) x {self.slaves} esclavos en el puerto {self.port}")
+
+    async def stop(self) -> None:
+        for server in self._servers:
+            await server.shutdown()
+        self._servers = []
+
+
+def run_forever(simulator: ModbusSimulator, ready=None) -> None:
+    """Ejecuta el simulador hasta que se interrumpa el proceso (útil con multiprocessing)."""
+    async def _serve():
+        await simulator.start()
+        if ready is not None:
+            ready.set()
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulador Modbus TCP para el Gateway EMS")
+    parser.add_argument("--servers", type=int, default=1)
+    parser.add_argument("--slaves", type=int, default=10)
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(0.0, 0.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--dropout-rate", type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_forever(ModbusSimulator(
+        servers=args.servers,
+        slaves=args.slaves,
+        port=args.port,
+        map_path=args.map,
+        profile=FaultProfile(
+            latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000),
+            error_rate=args.error_rate,
+            dropout_rate=args.dropout_rate,
+        ),
+    ))
@@ -0,0 +1,86 @@
+"""
+Prueba de carga del publicador MQTT contra un broker local.
+
+Simula `--devices` dispositivos con `--channels` canales sondeados cada
+`--interval` segundos y muestra las métricas del publicador (mensajes,
+descartes, profundidad de cola y latencia de publicación). Con `--spool`
+se puede parar el broker a mitad de prueba y ver el reenvío al volver.
+
+Uso (con el broker de docker-compose en localhost):
+    uv run -m src.scripts.mqtt_load --host localhost --devices 100 --channels 40 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import replace
+from typing import List, Optional
+from src.mqtt.publisher import PAYLOAD_ENCODERS, MqttPublisher, MqttSettings, QueuePolicy
+from src.storage.spool import DiskSpool, SpoolSettings
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    settings = replace(
+        MqttSettings.from_config(),
+        host=args.host,
+        port=args.port,
+        qos=args.qos,
+        max_queue=args.max_queue,
+        policy=QueuePolicy(args.policy),
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        payload_format=args.payload_format,
+        client_id=f"gateway_ems_load_{random.randint(0, 9999)}",
+    )
+    spool = None
+    if args.spool:
+        spool = DiskSpool(SpoolSettings(path=args.spool))
+        spool.open()
+    publisher = MqttPublisher(settings, spool=spool)
+    await publisher.start()
+
+    channels = [f"ch_{i}" for i in range(args.channels)]
+    deadline = time.monotonic() + args.duration
+    next_cycle = time.monotonic()
+    cycles = 0
+    try:
+        while time.monotonic() < deadline:
+            now = time.time()
+            for device in range(args.devices):
+                await publisher.publish_cycle(f"SIM_{device}", {name: random.uniform(0, 500) for name in channels}, now)
+            cycles += 1
+            next_cycle += args.interval
+            await asyncio.sleep(max(0.0, next_cycle - time.monotonic()))
+    finally:
+        await publisher.stop()
+
+    stats = publisher.get_stats()
+    stats["cycles"] = cycles
+    stats["samples"] = cycles * args.devices * args.channels
+    return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Carga sintética para el publicador MQTT del Gateway EMS")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=1)
+    parser.add_argument("--max-queue", type=int, default=1000)
+    parser.add_argument("--policy", choices=[str(p) for p in QueuePolicy], default=str(QueuePolicy.DROP_OLDEST))
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--flush-interval", type=float, default=5.0)
+    parser.add_argument("--payload-format", choices=list(PAYLOAD_ENCODERS), default="frame")
+    parser.add_argument("--spool", help="Directorio de spool en disco (store-and-forward) para probar cortes del broker")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(run(parse_args())), indent=2))
@@ -0,0 +1,383 @@
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+from src.config.config import configManager
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Cabecera de cada registro: longitud del payload, crc32(secuencia + payload), secuencia
+RECORD_HEADER = struct.Struct("<IIQ")
+SEQUENCE = struct.Struct("<Q")
+SEGMENT_SUFFIX = ".seg"
+ACK_FILE = "ack"
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+
+SpoolRecord = Tuple[int, bytes]
+# Recibe un lote en orden y devuelve True si el destino lo confirmó
+SpoolSender = Callable[[List[SpoolRecord]], Awaitable[bool]]
+
+
+@dataclass
+class SpoolSettings:
+    """Parámetros de la sección [SPOOL] de config.ini."""
+    path: str = "src/spool"
+    segment_bytes: int = 4 * 1024 * 1024
+    max_bytes: int = 256 * 1024 * 1024
+    fsync_interval: float = 1.0
+    replay_rate: float = 200.0
+    replay_batch: int = 50
+    use_mmap: bool = False
+
+    @classmethod
+    def from_config(cls) -> "SpoolSettings":
+        section = "SPOOL"
+        config = configManager.config
+        return cls(
+            path=config.get(section, "path", fallback="src/spool"),
+            segment_bytes=config.getint(section, "segment_bytes", fallback=4 * 1024 * 1024),
+            max_bytes=config.getint(section, "max_bytes", fallback=256 * 1024 * 1024),
+            fsync_interval=config.getfloat(section, "fsync_interval", fallback=1.0),
+            replay_rate=config.getfloat(section, "replay_rate", fallback=200.0),
+            replay_batch=config.getint(section, "replay_batch", fallback=50),
+            use_mmap=config.getboolean(section, "use_mmap", fallback=False),
+        )
+
+
+@dataclass
+class Segment:
+    """Fichero de segmento: registros con secuencias first_seq..last_seq."""
+    first_seq: int
+    path: Path
+    size: int = 0
+    last_seq: int = 0
+
+
+@dataclass
+class SpoolStats:
+    appended: int = 0
+    replayed: int = 0
+    dropped: int = 0
+    corrupt: int = 0
+    replay_failures: int = 0
+
+
+def _crc(seq: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(SEQUENCE.pack(seq)))
+
+
+def _scan(buffer: Any, start: int, end: int) -> Tuple[List[SpoolRecord], int, bool]:
+    """
+    Recorre registros de `buffer[start:end]`.
+
+    :return: (registros, offset tras el último registro válido, True si se
+             encontró un registro corrupto o truncado).
+    """
+    records: List[SpoolRecord] = []
+    offset = start
+    header_size = RECORD_HEADER.size
+    while offset + header_size <= end:
+        length, crc, seq = RECORD_HEADER.unpack_from(buffer, offset)
+        payload_end = offset + header_size + length
+        if length > MAX_RECORD_BYTES or payload_end > end:
+            return records, offset, True
+        payload = bytes(buffer[offset + header_size:payload_end])
+        if _crc(seq, payload) != crc:
+            return records, offset, True
+        records.append((seq, payload))
+        offset = payload_end
+    return records, offset, offset != end
+
+
+class DiskSpool:
+    """
+    Spool en disco de solo-añadir para guardar lecturas mientras el enlace está caído.
+
+    Los registros (payload opaco con secuencia y CRC32) se escriben de forma
+    secuencial en segmentos de `segment_bytes`; si el total supera `max_bytes`
+    se descartan los segmentos más antiguos. `replay` reenvía en orden a ritmo
+    limitado y un segmento solo se borra cuando todos sus registros han sido
+    confirmados con `ack`. El último ack se guarda en disco, así que tras un
+    reinicio no se reenvía lo ya confirmado.
+    """
+
+    def __init__(self, settings: Optional[SpoolSettings] = None):
+        self.settings = settings or SpoolSettings.from_config()
+        self.directory = Path(self.settings.path)
+        self.stats = SpoolStats()
+        self.segments: List[Segment] = []
+        self.acked_seq = 0
+        self.next_seq = 1
+        self._writer: Optional[BinaryIO] = None
+        self._dirty = False
+        self._last_fsync = 0.0
+        self._lock = threading.RLock()
+        # Posición de lectura del replay: (first_seq del segmento, offset)
+        self._cursor: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_config(cls) -> "DiskSpool":
+        spool = cls(SpoolSettings.from_config())
+        spool.open()
+        return spool
+
+    @property
+    def pending(self) -> int:
+        """Registros en disco aún no confirmados."""
+        return max(0, self.next_seq - 1 - self.acked_seq)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def open(self) -> None:
+        """Recupera los segmentos existentes (truncando colas incompletas) y abre el segmento activo."""
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.acked_seq = self.__load_ack()
+            for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+                segment = self.__recover(path)
+                if segment is None:
+                    continue
+                if segment.last_seq and segment.last_seq <= self.acked_seq:
+                    path.unlink()
+                    continue
+                self.segments.append(segment)
+
+            last = max((s.last_seq for s in self.segments), default=0)
+            self.next_seq = max(last, self.acked_seq) + 1
+            if not self.segments or self.segments[-1].size >= self.settings.segment_bytes:
+                self.__new_segment()
+            self._writer = open(self.segments[-1].path, "ab")
+            if self.pending:
+                logger.info(f"💾 Spool recuperado: {self.pending} registros pendientes en {len(self.segments)} segmentos")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self.flush(fsync=True)
+                self._writer.close()
+                self._writer = None
+
+    def append(self, payload: bytes) -> int:
+        """Añade un registro y devuelve su número de secuencia."""
+        if len(payload) > MAX_RECORD_BYTES:
+            raise ValueError(f"Registro demasiado grande para el spool: {len(payload)} bytes")
+        with self._lock:
+            if self._writer is None:
+                raise RuntimeError("El spool no está abierto")
+            active = self.segments[-1]
+            if active.size >= self.settings.segment_bytes:
+                active = self.__rotate()
+
+            seq = self.next_seq
+            self._writer.write(RECORD_HEADER.pack(len(payload), _crc(seq, payload), seq))
+            self._writer.write(payload)
+            self.next_seq += 1
+            active.size += RECORD_HEADER.size + len(payload)
+            active.last_seq = seq
+            self._dirty = True
+            self.stats.appended += 1
+
+            if self.size_bytes > self.settings.max_bytes:
+                self.__enforce_limit()
+            if time.monotonic() - self._last_fsync >= self.settings.fsync_interval:
+                self.flush(fsync=True)
+            return seq
+
+    def flush(self, fsync: bool = False) -> None:
+        with self._lock:
+            if self._writer is None or not self._dirty:
+                return
+            self._writer.flush()
+            if fsync:
+                os.fsync(self._writer.fileno())
+                self._last_fsync = time.monotonic()
+                self._dirty = False
+
+    def read_batch(self, max_records: int) -> List[SpoolRecord]:
+        """Lee en orden hasta `max_records` registros no confirmados a partir del cursor de replay."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+            records: List[SpoolRecord] = []
+            for segment in self.__segments_from_cursor():
+                offset = self._cursor[1] if self._cursor and self._cursor[0] == segment.first_seq else 0
+                # Sin cursor (tras rewind) se lee desde el inicio del segmento: lo
+                # ya confirmado se salta sin contar para el lote
+                chunk, offset = self.__read_segment(segment, offset, max_records - len(records), self.acked_seq)
+                records.extend(chunk)
+                self._cursor = (segment.first_seq, offset)
+                if len(records) >= max_records:
+                    # No se pasa al siguiente segmento con registros sin leer en este
+                    break
+            return records
+
+    def ack(self, seq: int) -> None:
+        """Confirma todos los registros hasta `seq` y borra los segmentos cerrados ya confirmados."""
+        with self._lock:
+            if seq <= self.acked_seq:
+                return
+            self.acked_seq = seq
+            self.__store_ack(seq)
+            while len(self.segments) > 1 and self.segments[0].last_seq <= seq:
+                segment = self.segments.pop(0)
+                segment.path.unlink(missing_ok=True)
+
+    def rewind(self) -> None:
+        """Vuelve a leer desde el último ack (tras un envío fallido)."""
+        with self._lock:
+            self._cursor = None
+
+    async def replay(self, send: SpoolSender, rate: Optional[float] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Reenvía lo pendiente en orden hasta vaciar el spool o hasta que `send`
+        falle. La lectura de disco va en un hilo para no bloquear el sondeo.
+
+        :param rate: Registros por segundo como máximo.
+        :return: Registros confirmados en esta llamada.
+        """
+        rate = rate or self.settings.replay_rate
+        batch_size = batch_size or self.settings.replay_batch
+        sent = 0
+        self.rewind()
+        while self.pending:
+            started = time.monotonic()
+            records = await asyncio.to_thread(self.read_batch, batch_size)
+            if not records:
+                break
+            try:
+                ok = await send(records)
+            except Exception as e:
+                logger.error(f"❌ Error reenviando el spool: {e}")
+                ok = False
+            if not ok:
+                self.stats.replay_failures += 1
+                self.rewind()
+                break
+            await asyncio.to_thread(self.ack, records[-1][0])
+            sent += len(records)
+            self.stats.replayed += len(records)
+            # Limitar el ritmo: len(records) registros cada len(records)/rate segundos
+            await asyncio.sleep(max(0.0, len(records) / rate - (time.monotonic() - started)))
+        if sent:
+            logger.info(f"💾 Spool: {sent} registros reenviados, {self.pending} pendientes")
+        return sent
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "segments": len(self.segments),
+            "size_bytes": self.size_bytes,
+            "pending": self.pending,
+            "acked_seq": self.acked_seq,
+            "next_seq": self.next_seq,
+            "appended": self.stats.appended,
+            "replayed": self.stats.replayed,
+            "dropped": self.stats.dropped,
+            "corrupt": self.stats.corrupt,
+            "replay_failures": self.stats.replay_failures,
+        }
+
+    def __segments_from_cursor(self) -> List[Segment]:
+        if self._cursor is not None:
+            for i, segment in enumerate(self.segments):
+                if segment.first_seq == self._cursor[0]:
+                    return self.segments[i:]
+            # El segmento del cursor se descartó por límite de tamaño
+            self._cursor = None
+        return [segment for segment in self.segments if segment.last_seq > self.acked_seq]
+
+    def __read_segment(self, segment: Segment, offset: int, max_records: int, after: int = 0) -> Tuple[List[SpoolRecord], int]:
+        if offset >= segment.size:
+            return [], offset
+        sealed = segment is not self.segments[-1]
+        with open(segment.path, "rb") as file:
+            if self.settings.use_mmap and sealed:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return self.__take(segment, mapped, offset, segment.size, max_records, after)
+            file.seek(offset)
+            data = file.read(segment.size - offset)
+        records, end = self.__take(segment, data, 0, len(data), max_records, after)
+        return records, offset + end
+
+    def __take(self, segment: Segment, buffer: Any, start: int, end: int, max_records: int, after: int = 0) -> Tuple[List[SpoolRecord], int]:
+        """Hasta `max_records` registros con secuencia mayor que `after` y el offset donde se paró."""
+        records: List[SpoolRecord] = []
+        offset = start
+        header_size = RECORD_HEADER.size
+        while len(records) < max_records and offset + header_size <= end:
+            length, crc, seq = RECORD_HEADER.unpack_from(buffer, offset)
+            payload_end = offset + header_size + length
+            payload = bytes(buffer[offset + header_size:payload_end]) if payload_end <= end else b""
+            if length > MAX_RECORD_BYTES or payload_end > end or _crc(seq, payload) != crc:
+                self.stats.corrupt += 1
+                logger.error(f"❌ Registro corrupto en {segment.path.name} (offset {offset}), se salta el resto del segmento")
+                return records, end
+            if seq > after:
+                records.append((seq, payload))
+            offset = payload_end
+        return records, offset
+
+    def __recover(self, path: Path) -> Optional[Segment]:
+        try:
+            first_seq = int(path.stem)
+        except ValueError:
+            logger.warning(f"Fichero ajeno en el spool, se ignora: {path.name}")
+            return None
+        data = path.read_bytes()
+        records, valid, corrupt = _scan(data, 0, len(data))
+        if corrupt:
+            # Cola escrita a medias (corte de energía): se trunca al último registro válido
+            logger.warning(f"⚠️ Segmento {path.name}: se truncan {len(data) - valid} bytes inválidos")
+            self.stats.corrupt += 1
+            with open(path, "r+b") as file:
+                file.truncate(valid)
+        last_seq = records[-1][0] if records else 0
+        return Segment(first_seq=first_seq, path=path, size=valid, last_seq=last_seq)
+
+    def __new_segment(self) -> Segment:
+        segment = Segment(first_seq=self.next_seq, path=self.directory / f"{self.next_seq:020d}{SEGMENT_SUFFIX}")
+        segment.path.touch()
+        self.segments.append(segment)
+        return segment
+
+    def __rotate(self) -> Segment:
+        self.flush(fsync=True)
+        self._writer.close()
+        segment = self.__new_segment()
+        self._writer = open(segment.path, "ab")
+        return segment
+
+    def __enforce_limit(self) -> None:
+        while len(self.segments) > 1 and self.size_bytes > self.settings.max_bytes:
+            segment = self.segments.pop(0)
+            lost = max(0, segment.last_seq - max(self.acked_seq, segment.first_seq - 1))
+            self.stats.dropped += lost
+            segment.path.unlink(missing_ok=True)
+            logger.warning(f"⚠️ Spool lleno ({self.settings.max_bytes} bytes): se descartan {lost} registros antiguos")
+            if segment.last_seq > self.acked_seq:
+                self.acked_seq = segment.last_seq
+                self.__store_ack(self.acked_seq)
+
+    def __load_ack(self) -> int:
+        try:
+            return int((self.directory / ACK_FILE).read_text().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            logger.warning("Fichero de ack del spool inválido, se reenvía todo")
+            return 0
+
+    def __store_ack(self, seq: int) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            file.write(str(seq))
+        os.replace(tmp_path, self.directory / ACK_FILE)
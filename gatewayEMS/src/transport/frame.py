@@ -0,0 +1,274 @@
+"""
+Formato binario de tramas de lecturas (gateway -> servidor).
+
+Existe una copia en gatewayApi/src/util/frame.py: cualquier cambio
+del formato debe hacerse en ambas y subir FRAME_VERSION.
+
+Disposición (little-endian):
+
+    cabecera   HEADER: magic, versión, flags, nº dispositivos, nº canales,
+               nº filas, nº muestras, timestamp base (ms)
+    diccionario  dispositivos: varint longitud + utf-8
+                 canales: varint índice de dispositivo, tipo ('f' | 'd' | 'i'),
+                          varint longitud + utf-8
+    filas      por fila: delta del timestamp en ms respecto a la anterior
+               (zigzag varint) y nº de muestras (varint)
+    ids        id de canal de cada muestra (uint16)
+    valores    empaquetados con el tipo de su canal (float32/float64/int32)
+    calidad    2 bits por muestra, solo si FLAG_QUALITY
+
+Una fila son las lecturas de un dispositivo en un instante (un ciclo de
+sondeo), así que el timestamp se guarda una vez por ciclo y no por muestra.
+"""
+import json
+import math
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+FRAME_MAGIC = b"\xfeE"
+FRAME_VERSION = 1
+HEADER = struct.Struct("<2sBBHHIIq")
+
+# Hay muestras con calidad distinta de 0 (buena) y la sección de calidad está presente
+FLAG_QUALITY = 0x01
+
+# Tipos de valor del diccionario
+TYPE_FLOAT32 = "f"
+TYPE_FLOAT64 = "d"
+TYPE_INT32 = "i"
+INT32_MIN, INT32_MAX = -(2 ** 31), 2 ** 31 - 1
+MAX_CHANNELS = 0xFFFF
+
+Number = Union[int, float]
+
+
+@dataclass
+class FrameRow:
+    """Lecturas de un dispositivo en un instante. `quality` solo lista los canales no buenos."""
+    device: str
+    timestamp: float
+    values: Dict[str, Number]
+    quality: Optional[Dict[str, int]] = None
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_text(out: bytearray, text: str) -> None:
+    encoded = text.encode()
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_text(data: bytes, offset: int) -> Tuple[str, int]:
+    length, offset = _read_varint(data, offset)
+    return data[offset:offset + length].decode(), offset + length
+
+
+def _value_type(current: Optional[str], value: Number, float64: bool) -> str:
+    if current in (TYPE_FLOAT32, TYPE_FLOAT64):
+        return current
+    if isinstance(value, int) and INT32_MIN <= value <= INT32_MAX:
+        return TYPE_INT32
+    return TYPE_FLOAT64 if float64 else TYPE_FLOAT32
+
+
+def encode_frame(rows: Iterable[FrameRow], float64: bool = False) -> bytes:
+    """
+    Codifica filas en una trama binaria.
+
+    Los canales con todos sus valores enteros (int de Python) van como int32;
+    el resto como float32, o float64 con `float64=True` (contadores de energía
+    con más de 7 cifras significativas).
+    """
+    # Una fila vacía no aporta nada y no tendría de dónde sacar su dispositivo
+    rows = [row for row in rows if row.values]
+    devices: Dict[str, int] = {}
+    channels: Dict[Tuple[int, str], int] = {}
+    types: List[str] = []
+    ids = array("H")
+    values: List[Number] = []
+    qualities: List[int] = []
+    has_quality = False
+
+    for row in rows:
+        device = devices.setdefault(row.device, len(devices))
+        quality = row.quality or {}
+        for name, value in row.values.items():
+            key = (device, name)
+            channel = channels.get(key)
+            if channel is None:
+                if len(channels) >= MAX_CHANNELS:
+                    raise ValueError(f"Demasiados canales en una trama (máximo {MAX_CHANNELS})")
+                channel = channels[key] = len(channels)
+                types.append(None)
+            types[channel] = _value_type(types[channel], value, float64)
+            ids.append(channel)
+            values.append(value)
+            q = quality.get(name, 0)
+            has_quality = has_quality or q != 0
+            qualities.append(q)
+
+    out = bytearray()
+    base_ms = round(rows[0].timestamp * 1000) if rows else 0
+    out += HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, FLAG_QUALITY if has_quality else 0,
+        len(devices), len(channels), len(rows), len(ids), base_ms,
+    )
+    for name in devices:
+        _write_text(out, name)
+    for (device, name), channel in channels.items():
+        _write_varint(out, device)
+        out.append(ord(types[channel]))
+        _write_text(out, name)
+
+    previous = base_ms
+    for row in rows:
+        ms = round(row.timestamp * 1000)
+        _write_varint(out, _zigzag(ms - previous))
+        _write_varint(out, len(row.values))
+        previous = ms
+
+    if sys.byteorder == "big":
+        ids.byteswap()
+    out += ids.tobytes()
+
+    fmt = "".join(types[channel] for channel in ids)
+    if fmt:
+        out += struct.pack("<" + fmt, *values)
+
+    if has_quality:
+        packed = bytearray((len(qualities) + 3) // 4)
+        for i, q in enumerate(qualities):
+            packed[i >> 2] |= (q & 0x03) << ((i & 3) << 1)
+        out += packed
+    return bytes(out)
+
+
+def decode_frame(data: bytes) -> List[FrameRow]:
+    """Decodifica una trama de encode_frame."""
+    magic, version, flags, n_devices, n_channels, n_rows, n_samples, base_ms = HEADER.unpack_from(data, 0)
+    if magic != FRAME_MAGIC:
+        raise ValueError("No es una trama binaria EMS")
+    if version != FRAME_VERSION:
+        raise ValueError(f"Versión de trama no soportada: {version}")
+    offset = HEADER.size
+
+    devices = []
+    for _ in range(n_devices):
+        name, offset = _read_text(data, offset)
+        devices.append(name)
+    channel_device = []
+    channel_name = []
+    types = []
+    for _ in range(n_channels):
+        device, offset = _read_varint(data, offset)
+        types.append(chr(data[offset]))
+        name, offset = _read_text(data, offset + 1)
+        channel_device.append(device)
+        channel_name.append(name)
+
+    row_ms = []
+    row_sizes = []
+    ms = base_ms
+    for _ in range(n_rows):
+        delta, offset = _read_varint(data, offset)
+        size, offset = _read_varint(data, offset)
+        ms += _unzigzag(delta)
+        row_ms.append(ms)
+        row_sizes.append(size)
+
+    ids = array("H")
+    ids.frombytes(data[offset:offset + 2 * n_samples])
+    if sys.byteorder == "big":
+        ids.byteswap()
+    offset += 2 * n_samples
+
+    values_format = struct.Struct("<" + "".join(types[channel] for channel in ids))
+    values = values_format.unpack_from(data, offset)
+    offset += values_format.size
+
+    qualities = None
+    if flags & FLAG_QUALITY:
+        packed = data[offset:offset + (n_samples + 3) // 4]
+        qualities = [(packed[i >> 2] >> ((i & 3) << 1)) & 0x03 for i in range(n_samples)]
+
+    rows = []
+    position = 0
+    for ms, size in zip(row_ms, row_sizes):
+        end = position + size
+        row_ids = ids[position:end]
+        row = FrameRow(
+            device=devices[channel_device[row_ids[0]]],
+            timestamp=ms / 1000,
+            values={channel_name[c]: v for c, v in zip(row_ids, values[position:end])},
+        )
+        if qualities is not None:
+            bad = {channel_name[c]: q for c, q in zip(row_ids, qualities[position:end]) if q}
+            row.quality = bad or None
+        rows.append(row)
+        position = end
+    return rows
+
+
+def encode_json(rows: Iterable[FrameRow]) -> bytes:
+    """Equivalente JSON legible de encode_frame, para depuración."""
+    items = []
+    for row in rows:
+        item = {
+            "device": row.device,
+            "ts": row.timestamp,
+            # NaN no es JSON válido
+            "values": {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in row.values.items()},
+        }
+        if row.quality:
+            item["quality"] = row.quality
+        items.append(item)
+    return json.dumps({"version": FRAME_VERSION, "rows": items}, separators=(",", ":")).encode()
+
+
+def decode_json(data: bytes) -> List[FrameRow]:
+    payload = json.loads(data)
+    return [
+        FrameRow(
+            device=item["device"],
+            timestamp=item["ts"],
+            values={k: (math.nan if v is None else v) for k, v in item["values"].items()},
+            quality=item.get("quality"),
+        )
+        for item in payload["rows"]
+    ]
+
+
+def decode(data: bytes) -> List[FrameRow]:
+    """Decodifica una trama binaria o JSON según su primer byte."""
+    if data[:2] == FRAME_MAGIC:
+        return decode_frame(data)
+    return decode_json(data)
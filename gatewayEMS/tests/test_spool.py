@@ -0,0 +1,40 @@
+import asyncio
+import tempfile
+import unittest
+from src.storage.spool import DiskSpool, SpoolSettings
+
+
+class ReplayAfterFailureTest(unittest.TestCase):
+    """Un envío fallido no debe dar por confirmados registros que no se enviaron."""
+
+    def test_replay_resumes_after_failure_across_segments(self):
+        with tempfile.TemporaryDirectory() as path:
+            spool = DiskSpool(SpoolSettings(path=path, segment_bytes=3000, replay_rate=1e9, replay_batch=50))
+            spool.open()
+            for i in range(150):
+                spool.append(f"record-{i:03d}".encode())
+            self.assertGreater(len(spool.segments), 1)
+
+            delivered = []
+            batches = 0
+
+            async def flaky(records):
+                nonlocal batches
+                batches += 1
+                if batches == 2:
+                    return False
+                delivered.extend(seq for seq, _ in records)
+                return True
+
+            asyncio.run(spool.replay(flaky))
+            self.assertEqual(delivered, list(range(1, 51)))
+            self.assertEqual(spool.pending, 100)
+
+            asyncio.run(spool.replay(flaky))
+            self.assertEqual(delivered, list(range(1, 151)))
+            self.assertEqual(spool.pending, 0)
+            spool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()